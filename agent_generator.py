@@ -1,6 +1,7 @@
 import numpy as np
 from copy import deepcopy
 import itertools
+import os
 
 from agents_and_ideas import Agent, Idea
 from manager import GraphManager
@@ -64,6 +65,108 @@ class AgentGenerator:
             agents.add(agent)
         return agents
 
+    def generate_chunk(self, chunk_index: int, chunk_size: int, method='erdos', density=0.5, seed=0) -> np.ndarray:
+        """
+        Генерирует один блок строк матрицы hedges с собственным зерном
+        Args:
+            chunk_index: номер блока (строки chunk_index * chunk_size ...)
+            chunk_size: количество строк в блоке
+            method: 'erdos' (независимые биты) или 'dens' (фиксированное число единиц)
+            density: плотность единиц для method='dens'
+            seed: общее зерно популяции
+        Returns:
+            Матрица uint8 размера (rows, M), rows <= chunk_size
+        """
+        start = chunk_index * chunk_size
+        if start >= self.N or chunk_index < 0:
+            raise ValueError(f"Блок {chunk_index} вне популяции из {self.N} агентов")
+        rows = min(chunk_size, self.N - start)
+        # Зерно блока зависит только от (seed, chunk_index), поэтому любой блок
+        # можно перегенерировать независимо от остальных
+        rng = np.random.default_rng([seed, chunk_index])
+        if method == 'erdos':
+            return rng.integers(0, 2, (rows, self.M), dtype=np.uint8)
+        elif method == 'dens':
+            ones_count = int(self.M * density)
+            chunk = np.zeros((rows, self.M), dtype=np.uint8)
+            positions = np.argsort(rng.random((rows, self.M)), axis=1)[:, :ones_count]
+            np.put_along_axis(chunk, positions, 1, axis=1)
+            return chunk
+        raise ValueError(f"Неизвестный метод генерации: {method}")
+
+    def iter_chunks(self, chunk_size: int, method='erdos', density=0.5, seed=0):
+        """
+        Потоково выдаёт популяцию блоками строк, не держа её целиком в памяти
+        Args:
+            chunk_size: количество строк в блоке
+            method: 'erdos' или 'dens'
+            density: плотность единиц для method='dens'
+            seed: общее зерно популяции
+        Returns:
+            Генератор пар (индекс первого агента блока, матрица блока)
+        """
+        n_chunks = -(-self.N // chunk_size)
+        for chunk_index in range(n_chunks):
+            yield chunk_index * chunk_size, self.generate_chunk(chunk_index, chunk_size, method, density, seed)
+
+    def write_packed(self, path, chunk_size: int, method='erdos', density=0.5, seed=0, chunks=None) -> np.memmap:
+        """
+        Записывает популяцию в memory-mapped .npy файл с упакованными битами
+        Args:
+            path: путь к файлу
+            chunk_size: количество строк в блоке
+            method: 'erdos' или 'dens'
+            density: плотность единиц для method='dens'
+            seed: общее зерно популяции
+            chunks: номера блоков для записи (None - все); файл с нужной формой
+                создаётся, если его нет; для параллельной записи срезов файл
+                лучше заранее создать одним вызовом с chunks=[]
+        Returns:
+            memmap формы (N, ceil(M / 8))
+        """
+        shape = (self.N, -(-self.M // 8))
+        if chunks is not None and os.path.exists(path):
+            packed = np.load(path, mmap_mode='r+')
+            if packed.shape != shape:
+                raise ValueError(f"Файл {path} имеет форму {packed.shape}, ожидалась {shape}")
+        else:
+            packed = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=shape)
+        if chunks is None:
+            chunks = range(-(-self.N // chunk_size))
+        for chunk_index in chunks:
+            chunk = self.generate_chunk(chunk_index, chunk_size, method, density, seed)
+            start = chunk_index * chunk_size
+            packed[start:start + len(chunk)] = np.packbits(chunk, axis=1)
+        packed.flush()
+        return packed
+
+    @staticmethod
+    def read_packed(path, M: int, start=0, stop=None) -> np.ndarray:
+        """
+        Читает строки [start, stop) из файла, записанного write_packed
+        Args:
+            path: путь к файлу
+            M: количество идей (длина распакованной строки)
+        Returns:
+            Матрица uint8 размера (stop - start, M)
+        """
+        packed = np.load(path, mmap_mode='r')
+        return np.unpackbits(packed[start:stop], axis=1, count=M)
+
+    def agents_from_chunk(self, chunk: np.ndarray, start=0, model='mil1', alpha=2, c={'mil1':1, 'mil10':0.2, 'mil00':0.05, 'mil01':1}):
+        """
+        Собирает агентов из блока строк
+        Args:
+            chunk: матрица hedges блока
+            start: идентификатор первого агента блока
+        Returns:
+            Множество агентов
+        """
+        agents = set()
+        for i, row in enumerate(chunk):
+            agents.add(Agent(row.tolist(), start + i, model, alpha, c))
+        return agents
+
     def generate_structured_agents(self, pattern_type='clusters', model='mil1', alpha=2, c={'mil1':1, 'mil10':0.2, 'mil00':0.05, 'mil01':1}):
         """
         Генерирует агентов со структурированными паттернами
@@ -2,6 +2,8 @@ import numpy as np
 from copy import deepcopy
 import itertools
 
+from distances import to_float
+
 
 
 class Agent:
@@ -23,10 +25,10 @@ class Agent:
             raise ValueError("Вектор должен содержать только 0 и 1")
 
         self.hedges = hedges
-        self.U = 0
+        self._system = None
         self.identifier = identifier
+        self.U = 0
         self.M = len(hedges)
-        self._system = None
         self.model = model
         self.alpha = alpha
         self.c = c[model]
@@ -45,6 +47,18 @@ class Agent:
             return False
         return self.identifier == other.identifier
 
+    @property
+    def U(self) -> float:
+        """Полезность агента; изменение передаётся статистике системы, если она подключена"""
+        return self._U
+
+    @U.setter
+    def U(self, value: float):
+        system = self._system
+        if system is not None and system.stats is not None:
+            system.stats.on_utility(self, value)
+        self._U = value
+
     @property
     def ideas_dict(self) -> dict[int, 'Idea']:
         """Возвращает словарь идей из системы"""
@@ -75,6 +89,17 @@ class Agent:
                         total += deg - self.c * deg ** self.alpha - 0.5
             self.U = total
             return total
+        elif self.model == 'mil00' and self._system.C is not None:
+            total = 0
+            for i in range(self.M):
+                if self.hedges[i] == 1:
+                    if i in self.ideas_dict:
+                        deg = self.ideas_dict[i].get_deg()
+                        total -= self.c * deg ** self.alpha
+            # Соседи (включая себя) - ненулевые элементы строки C = B·Bᵀ
+            total += int(np.count_nonzero(self._system.C[self.identifier]))
+            self.U = total
+            return total
         elif self.model == 'mil00':
             total = 0
             neighbours = set()
@@ -90,12 +115,14 @@ class Agent:
         elif self.model == 'mil01':
             total = 0
             self._system.shortest()
+            # Целочисленные расстояния хранят метку недостижимости вместо inf
+            dist_row = to_float(self._system.dist_matrix[self.identifier])
             for i in range(N):
                 #print(f"shortest of {self.identifier, i} path is {self._system.dist_matrix[self.identifier, i]}")
                 if i == self.identifier:
                     ad = 0
                 else:
-                    ad = 1/self._system.dist_matrix[self.identifier, i]
+                    ad = 1/dist_row[i]
                 #print(f"ad is {ad}")
                 total += ad
             one_indices = [i for i, val in enumerate(self.hedges) if val == 1]
@@ -265,14 +292,17 @@ class Agent:
 
         return best_move
 
-    def make_best_move(self) -> bool:
+    def make_best_move(self, search=None) -> bool:
         """
         Выполняет лучшее изменение в векторе, если оно улучшает полезность
 
+        Args:
+            search: объект с методом best_move(agent) (например, neighborhoods.NeighborhoodSearch)
+                вместо find_best_move
         Returns:
             bool: True если изменение было сделано, False если улучшения нет
         """
-        best_move = self.find_best_move()
+        best_move = self.find_best_move() if search is None else search.best_move(self)
 
         if best_move is None:
             #print('нет перемен к лучшему')
@@ -323,8 +353,14 @@ class Idea:
     def invert(self, agent):
         if agent in self.agents:
             self.agents.remove(agent)
+            added = False
         else:
             self.agents.add(agent)
+            added = True
+        # Система поддерживает B, степени и матрицу совместного участия по каждому изменению
+        system = getattr(agent, '_system', None)
+        if system is not None:
+            system.on_invert(agent, self.identifier, added)
 
     def _set_agents(self, all_agents: set[Agent]) -> set[Agent]:
         """Возвращает множество объектов первого типа, у которых в позиции identifier стоит 1"""
@@ -0,0 +1,171 @@
+import numpy as np
+
+from population import idea_values
+from sync_engine import NO_IDEA, SyncEngine
+
+
+class AsyncBatchEngine(SyncEngine):
+    """
+    Асинхронная динамика (как Game.evolve_anim: за раунд каждый агент ходит один раз)
+    пакетами агентов, чьи ходы не влияют друг на друга
+
+    На каждом шаге лучшие ответы всех ещё не ходивших в раунде агентов считаются
+    одной матричной операцией (SyncEngine.best_responses). Затем агенты в порядке
+    обхода принимаются в пакет, пока это не меняет их ответ: агент откладывается,
+    если он состоит в идее, которую уже изменил принятый агент, или сам её меняет,
+    или если какой-либо его ход через изменённые идеи стал не хуже выбранного.
+    Для mil1, mil10 и mil00 остальные ходы агента от таких изменений не зависят,
+    поэтому пакет эквивалентен последовательным ходам его агентов по порядку,
+    а отложенные агенты ходят после них. Для mil01 расстояния зависят от всего
+    графа, и пакет всегда состоит из одного агента.
+    """
+
+    def __init__(self, hedges: np.ndarray, model='mil1', c=0.2, alpha=2, chunk_size=256, tol=1e-9):
+        """
+        Args:
+            hedges: матрица hedges (N, M), строка i - агент с id i
+            model: mil1, mil10, mil00 или mil01
+            c: коэффициент модели
+            alpha: степень функции
+            chunk_size: сколько агентов обрабатывать одним матричным блоком
+            tol: минимальный прирост хода и запас, с которым ход через изменённые идеи
+                считается «не хуже» выбранного
+        """
+        super().__init__(hedges, model=model, c=c, alpha=alpha, chunk_size=chunk_size, tol=tol)
+        self.degrees = self.B.sum(axis=0, dtype=np.int64)
+        self.batches = 0
+
+    def _changed_best(self, agent: int, touched: np.ndarray) -> float:
+        """
+        Наибольший прирост агента среди ходов, добавляющих одну из идей touched
+
+        Args:
+            agent: индекс агента (не состоит ни в одной идее touched)
+            touched: индексы идей, изменённых принятыми в пакет агентами
+        """
+        if self.model == 'mil01':
+            return np.inf
+        held = np.flatnonzero(self.B[agent])
+        if self.model in ('mil1', 'mil10'):
+            add_gain = idea_values(self.degrees[touched] + 1, self.model, self.c, self.alpha)
+            best = add_gain.max()
+            if len(held):
+                drop_gain = -idea_values(self.degrees[held], self.model, self.c, self.alpha)
+                best = max(best, best + drop_gain.max())
+            return float(best)
+        # mil00: соседи через добавляемую идею и через идеи агента
+        row = self.B[agent].astype(np.int64)
+        own = len(held)
+        # Сброс идеи i в обмене: теряются соседи, общие только через i
+        drop_gain = np.zeros(len(held))
+        lost_only = []
+        for n, i in enumerate(held):
+            members = np.flatnonzero(self.B[:, i])
+            members = members[members != agent]
+            only = members[self.B[members].astype(np.int64) @ row == 1]
+            lost_only.append(only)
+            drop_gain[n] = -len(only) + self.c * self.degrees[i] ** self.alpha
+        best = -np.inf
+        for y in touched:
+            members = np.flatnonzero(self.B[:, y])
+            members = members[members != agent]
+            gained = np.count_nonzero(self.B[members].astype(np.int64) @ row == 0)
+            add_gain = gained - self.c * (self.degrees[y] + 1) ** self.alpha
+            # Одиночное добавление; сам агент становится себе соседом, если идей не было
+            best = max(best, add_gain + (own == 0))
+            for n, only in enumerate(lost_only):
+                # Соседи, общие только через сбрасываемую идею, сохраняются, если они в y
+                best = max(best, drop_gain[n] + add_gain + np.count_nonzero(self.B[only, y]))
+        return float(best)
+
+    def _apply(self, agent: int, drop: int, add: int):
+        if drop != NO_IDEA:
+            self.B[agent, drop] = 0
+            self.degrees[drop] -= 1
+        if add != NO_IDEA:
+            self.B[agent, add] = 1
+            self.degrees[add] += 1
+        self.dist = None
+
+    def batch_step(self, pending: list[int]):
+        """
+        Один пакет: ответы агентов pending и применение ходов независимых из них
+
+        Args:
+            pending: агенты, ещё не ходившие в раунде, в порядке обхода
+        Returns:
+            ходы пакета [(агент, drop, add)] (без агентов, не нашедших улучшения),
+            принятые агенты и отложенные агенты в порядке обхода
+        """
+        drop, add, improvement = self.best_responses(pending)
+        touched = np.zeros(self.M, dtype=bool)
+        moves, accepted, deferred = [], [], []
+        for k, agent in enumerate(pending):
+            moving = improvement[k] > self.tol
+            ideas = [idea for idea in (drop[k], add[k]) if idea != NO_IDEA] if moving else []
+            if touched.any():
+                held = self.B[agent] == 1
+                if touched[held].any() or touched[ideas].any():
+                    deferred.append(agent)
+                    continue
+                threshold = improvement[k] - self.tol if moving else self.tol
+                if self._changed_best(agent, np.flatnonzero(touched)) > threshold:
+                    deferred.append(agent)
+                    continue
+            accepted.append(agent)
+            if moving:
+                self._apply(agent, drop[k], add[k])
+                touched[ideas] = True
+                moves.append((agent, int(drop[k]), int(add[k])))
+        self.batches += 1
+        return moves, accepted, deferred
+
+    def run(self, max_rounds=None, order=None, callback=None):
+        """
+        Асинхронная динамика до равновесия или предела раундов
+
+        Args:
+            max_rounds: предел числа раундов (по умолчанию 500 * N, как в evolve_anim)
+            order: порядок обхода агентов и строк в снимках (например, порядок Game.agents)
+            callback: функция (раунд, равновесие), вызываемая после каждого раунда
+        Returns:
+            snapshots, edge_changes, utilities, flagss в формате Game.evolve_anim
+        """
+        if max_rounds is None:
+            max_rounds = 500 * self.N
+        order = np.arange(self.N) if order is None else np.asarray(order)
+        snapshots, edge_changes, utilities, flagss = [], [], [], []
+        seen = set()
+        flag = False
+        cycle_flag = False
+        raund = 0
+        while not flag and raund < max_rounds and not cycle_flag:
+            raund += 1
+            # Раунд детерминирован: повтор состояния в его начале означает цикл (как в Game.evolve_anim)
+            key = self.B.tobytes()
+            cycle_flag = key in seen
+            seen.add(key)
+            snapshots.append(self.B[order].copy())
+            utilities.append(self.utilities()[order].tolist())
+            flagss.append(flag)
+            changed_edges = set()
+            pending = list(order)
+            while pending:
+                moves, accepted, pending = self.batch_step(pending)
+                for agent, i, j in moves:
+                    if i != NO_IDEA:
+                        changed_edges.add((f"A{agent}", f"I{i}", -1))
+                    if j != NO_IDEA:
+                        changed_edges.add((f"A{agent}", f"I{j}", 1))
+            edge_changes.append(changed_edges)
+            flag = len(changed_edges) == 0
+            if callback is not None:
+                callback(raund, flag)
+
+        self.rounds = raund
+        self.outcome = 'equilibrium' if flag else 'cycle' if cycle_flag else 'limit'
+        snapshots.append(self.B[order].copy())
+        utilities.append(self.utilities()[order].tolist())
+        edge_changes.append(set())
+        flagss.append(flag)
+        return snapshots, edge_changes, utilities, flagss
@@ -0,0 +1,113 @@
+import numpy as np
+import hashlib
+import json
+import os
+import uuid
+
+
+class ResultCache:
+    """
+    Контентно-адресуемый кэш завершённых запусков на диске
+
+    Запись хранится в файле <ключ>.npz; ключ - хэш начальной матрицы hedges,
+    модели, c, alpha, типа динамики и прочих настроек, влияющих на исход. Время изменения файла служит отметкой
+    последнего обращения, по ней вытесняются самые старые записи.
+    """
+
+    def __init__(self, root, max_bytes=1 << 30):
+        """
+        Args:
+            root: каталог кэша (создаётся при необходимости)
+            max_bytes: предельный суммарный размер записей
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def make_key(hedges: np.ndarray, model: str, c: float, alpha, dynamics: str, options: dict = None) -> str:
+        """
+        Ключ запуска
+
+        Args:
+            hedges: начальная матрица hedges (строки по возрастанию id агентов)
+            model: модель полезности
+            c: коэффициент этой модели
+            alpha: степень функции
+            dynamics: имя динамики
+            options: прочие настройки, влияющие на исход (сериализуемый в JSON словарь,
+                например настройки GraphManager и поиска хода)
+        Returns:
+            sha256 в шестнадцатеричном виде
+        """
+        hedges = np.ascontiguousarray(hedges, dtype=np.uint8)
+        digest = hashlib.sha256()
+        header = [list(hedges.shape), model, float(c), float(alpha), dynamics]
+        if options:
+            header.append(options)
+        digest.update(json.dumps(header, sort_keys=True).encode())
+        digest.update(hedges.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + '.npz')
+
+    def get(self, key: str) -> dict | None:
+        """
+        Возвращает запись или None
+
+        Returns:
+            Словарь с ключами final_hedges, utilities, summary
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                result = {
+                    'final_hedges': entry['final_hedges'],
+                    'utilities': entry['utilities'],
+                    'summary': json.loads(str(entry['summary'])),
+                }
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return result
+
+    def put(self, key: str, final_hedges: np.ndarray, utilities, summary: dict):
+        """Сохраняет запись и при превышении размера вытесняет давно не использованные"""
+        tmp_path = os.path.join(self.root, f".{key}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, final_hedges=np.asarray(final_hedges, dtype=np.uint8),
+                                utilities=np.asarray(utilities, dtype=float),
+                                summary=np.array(json.dumps(summary)))
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Удаляет самые старые записи, пока суммарный размер больше max_bytes"""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.npz'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Удаляет все записи"""
+        for name in os.listdir(self.root):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(self.root, name))
@@ -0,0 +1,222 @@
+"""
+Командная строка для запуска симуляций без правки main.py
+
+    python cli.py run --N 40 --M 20 --model mil00 --save run.npz
+    python cli.py sweep --N 20 40 --model mil1 mil00 --replicas 5 --store results
+    python cli.py sweep --N 20 40 --replicas 5 --queue /shared/queue
+    python cli.py worker --queue /shared/queue --store /shared/results --wait
+    python cli.py render run.npz --output run.mp4 [--raster incidence]
+    python cli.py report run.npz --output run.png
+    python cli.py bench --N 40 --M 20 --dynamics by_one sync
+    python cli.py check --candidate integer --seeds 10
+    python cli.py serve --port 8765 --workers 4
+
+Тяжёлые библиотеки (networkx, matplotlib) импортируются только командами render и report.
+"""
+import argparse
+import json
+import sys
+import time
+
+
+MODELS = ['mil1', 'mil10', 'mil00', 'mil01']
+DYNAMICS = ['by_one', 'anim', 'sim', 'types', 'sync', 'batch']
+
+
+def _coefs(args) -> dict:
+    """Словарь коэффициентов: значения по умолчанию плюс --c для выбранных моделей"""
+    from ensemble import DEFAULT_COEFS
+    coefs = dict(DEFAULT_COEFS)
+    if args.c is not None:
+        for model in (args.model if isinstance(args.model, list) else [args.model]):
+            coefs[model] = args.c
+    return coefs
+
+
+def _add_game_options(parser, multi=False, with_dynamics=True):
+    nargs = '+' if multi else None
+    parser.add_argument('--N', type=int, nargs=nargs, default=[40] if multi else 40, help='количество агентов')
+    parser.add_argument('--M', type=int, nargs=nargs, default=[20] if multi else 20, help='количество идей')
+    parser.add_argument('--model', choices=MODELS, nargs=nargs, default=['mil1'] if multi else 'mil1')
+    parser.add_argument('--c', type=float, default=None, help='коэффициент выбранной модели')
+    parser.add_argument('--alpha', type=float, nargs=nargs, default=[2] if multi else 2)
+    parser.add_argument('--method', choices=['erdos', 'dens'], nargs=nargs, default=['erdos'] if multi else 'erdos')
+    parser.add_argument('--dens', type=float, nargs=nargs, default=[0.5] if multi else 0.5)
+    if with_dynamics:
+        parser.add_argument('--dynamics', choices=DYNAMICS, nargs=nargs, default=['by_one'] if multi else 'by_one')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def cmd_run(args):
+    from game import Game
+    game = Game(args.N, args.M, model=args.model, alpha=args.alpha, c=_coefs(args), method=args.method,
+                dens=args.dens, seed=args.seed, verbose=args.verbose, cache=args.cache)
+    if args.save:
+        from trajectory import save_trajectory
+        save_trajectory(args.save, *game.run(args.dynamics))
+        summary = game.summary()
+    else:
+        summary = game.solve(args.dynamics)
+    print(json.dumps(summary))
+
+
+def cmd_sweep(args):
+    from sweep import ResultStore, grid_design, run_sweep
+    space = {'N': args.N, 'M': args.M, 'model': args.model, 'alpha': args.alpha,
+             'method': args.method, 'dens': args.dens, 'dynamics': args.dynamics, 'c': [_coefs(args)]}
+    specs = grid_design(space, replicas=args.replicas, seed=args.seed or 0)
+    if args.queue is not None:
+        from workqueue import WorkQueue
+        queue = WorkQueue(args.queue)
+        added = queue.submit(specs)
+        print(f"в очередь добавлено {added} из {len(specs)} запусков: {json.dumps(queue.status())}")
+        return
+    if args.store is None:
+        sys.exit("нужен --store (или --queue для распределённого выполнения)")
+    store = ResultStore(args.store)
+    done = run_sweep(specs, store, workers=args.workers, flush_every=args.flush_every, cache=args.cache)
+    print(f"выполнено {done} из {len(specs)} запусков, результаты в {args.store}")
+
+
+def cmd_worker(args):
+    from workqueue import run_worker
+    done = run_worker(args.queue, args.store, worker=args.name, lease_seconds=args.lease, flush_every=args.flush_every,
+                      cache=args.cache, wait=args.wait, max_tasks=args.max_tasks)
+    print(f"выполнено {done} запусков, результаты в {args.store}")
+
+
+def cmd_render(args):
+    from trajectory import load_trajectory
+    from visual import animate, animate_raster
+    snapshots, edge_changes, utilities, flagss = load_trajectory(args.input)
+    if args.raster is None:
+        animate(snapshots, edge_changes, utilities, flagss, filename=args.output, interval=args.interval)
+    else:
+        animate_raster(snapshots, edge_changes, utilities, flagss, filename=args.output, interval=args.interval,
+                       view=args.raster)
+
+
+def cmd_report(args):
+    from trajectory import load_trajectory
+    from visual import trajectory_report
+    snapshots, edge_changes, utilities, flagss = load_trajectory(args.input)
+    trajectory_report(snapshots, edge_changes, utilities, flagss, filename=args.output)
+
+
+def cmd_bench(args):
+    from game import Game
+    results = []
+    for dynamics in args.dynamics:
+        times = []
+        for repeat in range(args.repeat):
+            seed = (args.seed or 0) + repeat
+            game = Game(args.N, args.M, model=args.model, alpha=args.alpha, c=_coefs(args), method=args.method,
+                        dens=args.dens, seed=seed, verbose=False)
+            start = time.perf_counter()
+            game.run(dynamics)
+            times.append(time.perf_counter() - start)
+        results.append({'dynamics': dynamics, 'best': min(times), 'mean': sum(times) / len(times),
+                        'rounds': game.rounds, 'outcome': game.outcome})
+    for result in results:
+        print(json.dumps(result))
+
+
+def cmd_check(args):
+    from harness import differential_check, print_reports
+    from ensemble import DEFAULT_COEFS
+    coefs = None if args.c is None else [{**DEFAULT_COEFS, **{model: c for model in args.model}} for c in args.c]
+    reports = differential_check(candidate=args.candidate, reference=args.reference, models=args.model,
+                                 seeds=range(args.seeds), N=args.N, M=args.M, c=coefs, method=args.method,
+                                 dynamics=args.dynamics, atol=args.atol)
+    print_reports(reports)
+    if any(report['mismatch'] is not None for report in reports):
+        sys.exit(1)
+
+
+def cmd_serve(args):
+    from service import serve
+    print(f"сервис на http://{args.host}:{args.port}")
+    serve(workers=args.workers, host=args.host, port=args.port, cache=args.cache)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Симуляции агентов и идей')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='один запуск, сводка в stdout')
+    _add_game_options(run)
+    run.add_argument('--cache', default=None, help='каталог кэша результатов')
+    run.add_argument('--save', default=None, help='сохранить траекторию в .npz для render')
+    run.add_argument('--verbose', action='store_true', help='печатать ход динамики')
+    run.set_defaults(func=cmd_run)
+
+    sweep = commands.add_parser('sweep', help='перебор параметров с сохранением результатов')
+    _add_game_options(sweep, multi=True)
+    sweep.add_argument('--replicas', type=int, default=1)
+    sweep.add_argument('--store', default=None, help='каталог хранилища результатов')
+    sweep.add_argument('--queue', default=None, help='поставить запуски в общую очередь вместо выполнения')
+    sweep.add_argument('--workers', type=int, default=None)
+    sweep.add_argument('--flush-every', type=int, default=10)
+    sweep.add_argument('--cache', default=None, help='каталог кэша результатов')
+    sweep.set_defaults(func=cmd_sweep)
+
+    worker = commands.add_parser('worker', help='исполнитель запусков из общей очереди')
+    worker.add_argument('--queue', required=True, help='каталог очереди (sweep --queue)')
+    worker.add_argument('--store', required=True, help='общий каталог хранилища результатов')
+    worker.add_argument('--name', default=None, help='идентификатор исполнителя')
+    worker.add_argument('--lease', type=float, default=300.0, help='срок аренды без продления, с')
+    worker.add_argument('--flush-every', type=int, default=1)
+    worker.add_argument('--cache', default=None, help='каталог кэша результатов')
+    worker.add_argument('--wait', action='store_true', help='ждать, пока другие исполнители держат аренды')
+    worker.add_argument('--max-tasks', type=int, default=None)
+    worker.set_defaults(func=cmd_worker)
+
+    render = commands.add_parser('render', help='видео по сохранённой траектории')
+    render.add_argument('input', help='файл траектории из run --save')
+    render.add_argument('--output', default='animation.mp4')
+    render.add_argument('--interval', type=int, default=1000)
+    render.add_argument('--raster', choices=['incidence', 'edges'], default=None,
+                        help='растровый вид для больших популяций вместо графа networkx')
+    render.set_defaults(func=cmd_render)
+
+    report = commands.add_parser('report', help='сводный рисунок по сохранённой траектории')
+    report.add_argument('input', help='файл траектории из run --save')
+    report.add_argument('--output', default='report.png')
+    report.set_defaults(func=cmd_report)
+
+    bench = commands.add_parser('bench', help='время динамик на одной конфигурации')
+    _add_game_options(bench, with_dynamics=False)
+    bench.add_argument('--dynamics', choices=DYNAMICS, nargs='+', default=['by_one'])
+    bench.add_argument('--repeat', type=int, default=3)
+    bench.set_defaults(func=cmd_bench)
+
+    check = commands.add_parser('check', help='пошаговое сравнение реализации с эталоном')
+    check.add_argument('--candidate', default='integer', help='имя из harness.ENGINES')
+    check.add_argument('--reference', default='reference', help='имя из harness.ENGINES')
+    check.add_argument('--model', choices=MODELS, nargs='+', default=MODELS)
+    check.add_argument('--dynamics', choices=DYNAMICS, default=None, help='по умолчанию by_one, для mil01 - sim')
+    check.add_argument('--c', type=float, nargs='+', default=None,
+                       help='коэффициенты выбранных моделей (по умолчанию DEFAULT_COEFS и mil01 = 1/N)')
+    check.add_argument('--method', choices=['erdos', 'dens'], nargs='+', default=['erdos', 'dens'])
+    check.add_argument('--seeds', type=int, default=5)
+    check.add_argument('--N', type=int, default=12)
+    check.add_argument('--M', type=int, default=6)
+    check.add_argument('--atol', type=float, default=0.0)
+    check.set_defaults(func=cmd_check)
+
+    serve = commands.add_parser('serve', help='локальный сервис запусков с потоком прогресса')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--workers', type=int, default=2)
+    serve.add_argument('--cache', default=None, help='каталог кэша результатов')
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,85 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from ensemble import DEFAULT_COEFS
+from game import Game
+from manager import GraphManager
+
+
+# Общие для всех конфигураций данные воркера: начальная матрица и готовые структуры
+_shared = {}
+
+
+def _init_worker(hedges: np.ndarray, precomputed: dict):
+    _shared['hedges'] = hedges
+    _shared['precomputed'] = precomputed
+
+
+def _normalize(config, dynamics: str) -> dict:
+    """Приводит конфигурацию (model, c, alpha) или словарь к словарю с полным набором полей"""
+    if isinstance(config, dict):
+        config = dict(config)
+    else:
+        model, c, alpha = config
+        config = {'model': model, 'c': c, 'alpha': alpha}
+    config.setdefault('alpha', 2)
+    config.setdefault('dynamics', dynamics)
+    c = config.get('c', DEFAULT_COEFS[config['model']])
+    config['c'] = dict(c) if isinstance(c, dict) else {**DEFAULT_COEFS, config['model']: c}
+    return config
+
+
+def _run_config(config: dict) -> dict:
+    game = Game.from_hedges(_shared['hedges'], model=config['model'], alpha=config['alpha'], c=config['c'],
+                            verbose=False, cache=config.get('cache'), precomputed=_shared['precomputed'])
+    summary = dict(game.solve(config['dynamics']))
+    summary.update({name: value for name, value in config.items() if name != 'cache'})
+    return summary
+
+
+def compare_models(hedges: np.ndarray, configs: list, dynamics='by_one', workers=1, cache=None) -> list[dict]:
+    """
+    Запускает одну и ту же начальную популяцию под несколькими моделями
+
+    Структуры начального состояния (B, C, веса рёбер и, если есть mil01,
+    кратчайшие пути) считаются один раз и передаются каждой игре.
+
+    Args:
+        hedges: начальная матрица hedges (N, M)
+        configs: список (model, c, alpha) или словарей с ключами model, c, alpha, dynamics;
+            c - число (коэффициент этой модели) или словарь коэффициентов
+        dynamics: динамика по умолчанию для Game.solve
+        workers: число процессов (1 - в текущем процессе)
+        cache: каталог ResultCache (None - без кэша)
+    Returns:
+        Сводки Game.summary в порядке configs, дополненные полями конфигурации
+    """
+    hedges = np.asarray(hedges, dtype=np.uint8)
+    configs = [_normalize(config, dynamics) for config in configs]
+    for config in configs:
+        config['cache'] = cache
+    with_dist = any(config['model'] == 'mil01' for config in configs)
+    precomputed = GraphManager.precompute(hedges, with_dist=with_dist)
+    if workers == 1:
+        _init_worker(hedges, precomputed)
+        return [_run_config(config) for config in configs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(hedges, precomputed)) as pool:
+        return list(pool.map(_run_config, configs))
+
+
+def comparison_table(summaries: list[dict]) -> list[dict]:
+    """Краткая таблица для сравнения моделей: модель, c, исход, раунды, благосостояние"""
+    rows = []
+    for summary in summaries:
+        model = summary['model']
+        rows.append({
+            'model': model,
+            'c': summary['c'][model],
+            'alpha': summary['alpha'],
+            'dynamics': summary['dynamics'],
+            'outcome': summary['outcome'],
+            'rounds': summary['rounds'],
+            'welfare': summary['welfare'],
+        })
+    return rows
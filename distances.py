@@ -0,0 +1,123 @@
+import numpy as np
+
+
+def unreachable(dtype) -> int:
+    """Значение-метка «недостижимо» для целочисленной матрицы расстояний"""
+    return np.iinfo(dtype).max
+
+
+def distance_dtype(N: int, max_weight: int):
+    """
+    Наименьший подходящий тип для расстояний: путь проходит не больше N - 1 ребра
+    веса не больше max_weight (с запасом на одно ребро при релаксации),
+    а максимум типа занят меткой недостижимости
+    """
+    if N * max_weight < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+def integer_weights(adj: np.ndarray) -> np.ndarray:
+    """
+    Целочисленная матрица весов из матрицы смежности GraphManager
+
+    Args:
+        adj: веса рёбер (степени идей), inf - нет ребра
+    Returns:
+        Матрица int32, 0 - нет ребра
+    """
+    adj = np.asarray(adj)
+    return np.where(np.isfinite(adj), adj, 0).astype(np.int32)
+
+
+def to_float(dist: np.ndarray) -> np.ndarray:
+    """Переводит целочисленные расстояния в float64 с inf вместо метки недостижимости"""
+    dist = np.asarray(dist)
+    if not np.issubdtype(dist.dtype, np.integer):
+        return dist
+    result = dist.astype(float)
+    result[dist == unreachable(dist.dtype)] = np.inf
+    return result
+
+
+def layered_apsp(hedges: np.ndarray, degrees: np.ndarray = None, dtype=None) -> np.ndarray:
+    """
+    Кратчайшие пути между всеми агентами через двудольное расширение графа
+
+    Ребро агентов весом «минимальная степень общей идеи» эквивалентно пути
+    агент -> идея j (стоимость d_j) -> агент (стоимость 0). Расстояния считаются
+    послойной релаксацией по идеям для всех источников сразу: слой -
+    «войти в идею» и «выйти из идеи»; число слоёв равно наибольшему числу идей
+    на кратчайшем пути, а слой стоит O(N * nnz(B)) целочисленных операций.
+
+    Args:
+        hedges: матрица hedges (N, M)
+        degrees: степени идей (по умолчанию суммы столбцов hedges)
+        dtype: тип результата (по умолчанию distance_dtype)
+    Returns:
+        Матрица расстояний (N, N) с меткой unreachable(dtype) для недостижимых пар
+    """
+    B = np.asarray(hedges) == 1
+    N, M = B.shape
+    if degrees is None:
+        degrees = B.sum(axis=0)
+    degrees = np.asarray(degrees, dtype=np.int64)
+    if dtype is None:
+        dtype = distance_dtype(N, max(int(degrees.max()) if M else 1, 1))
+    sentinel = unreachable(dtype)
+    members = [np.flatnonzero(B[:, j]) for j in range(M)]
+    # Через идею степени < 2 нельзя попасть к другому агенту
+    ideas = [j for j in range(M) if len(members[j]) >= 2]
+    dist = np.full((N, N), sentinel, dtype=np.int64)
+    np.fill_diagonal(dist, 0)
+    entry = np.full((N, M), sentinel, dtype=np.int64)
+    changed = True
+    while changed:
+        changed = False
+        for j in ideas:
+            best = dist[:, members[j]].min(axis=1) + degrees[j]
+            improve = best < entry[:, j]
+            if improve.any():
+                entry[improve, j] = best[improve]
+                changed = True
+        if not changed:
+            break
+        changed = False
+        for j in ideas:
+            block = dist[:, members[j]]
+            relaxed = np.minimum(block, entry[:, j, None])
+            if (relaxed < block).any():
+                dist[:, members[j]] = relaxed
+                changed = True
+    dist[dist >= sentinel] = sentinel
+    return dist.astype(dtype)
+
+
+def dial_sssp(weights: np.ndarray, source: int, dtype=None) -> np.ndarray:
+    """
+    Кратчайшие пути из одной вершины для малых целых весов (корзины Дайала)
+
+    Args:
+        weights: матрица целых весов, 0 - нет ребра
+        source: вершина-источник
+        dtype: тип результата (по умолчанию distance_dtype)
+    Returns:
+        Вектор расстояний с меткой unreachable(dtype) для недостижимых вершин
+    """
+    weights = np.asarray(weights)
+    N = len(weights)
+    if dtype is None:
+        dtype = distance_dtype(N, max(int(weights.max()) if weights.size else 1, 1))
+    sentinel = unreachable(dtype)
+    dist = np.full(N, sentinel, dtype=np.int64)
+    dist[source] = 0
+    t = 0
+    while True:
+        frontier = np.flatnonzero(dist == t)
+        rows = weights[frontier]
+        candidates = np.where(rows > 0, rows + t, sentinel).min(axis=0)
+        np.minimum(dist, candidates, out=dist)
+        pending = dist[(dist > t) & (dist != sentinel)]
+        if not len(pending):
+            return dist.astype(dtype)
+        t = int(pending.min())
@@ -0,0 +1,134 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from game import Game
+
+
+DEFAULT_COEFS = {'mil1': 1, 'mil10': 0.2, 'mil00': 0.05, 'mil01': 1}
+
+
+def make_spec(N: int, M: int, model='mil1', alpha=2, c=None, method='erdos', dens=0.5, dynamics='by_one', seed=None) -> dict:
+    """
+    Собирает описание одного запуска в словарь, пригодный для передачи в воркер
+
+    Args:
+        N: количество агентов
+        M: количество идей
+        model: mil1, mil10, mil01, mil00
+        alpha: степень функции
+        c: словарь коэффициентов моделей
+        method: способ генерации агентов ('erdos' или 'dens')
+        dens: плотность для method='dens'
+        dynamics: имя динамики для Game.run
+        seed: зерно запуска
+    Returns:
+        Словарь параметров запуска
+    """
+    return {
+        'N': N, 'M': M, 'model': model, 'alpha': alpha,
+        'c': dict(DEFAULT_COEFS if c is None else c),
+        'method': method, 'dens': dens, 'dynamics': dynamics, 'seed': seed,
+    }
+
+
+def summarize(game: Game) -> dict:
+    """Сводка завершённого запуска (см. Game.summary)"""
+    return game.summary()
+
+
+def run_spec(spec: dict, cache=None) -> dict:
+    """
+    Выполняет один запуск по описанию из make_spec и возвращает сводку вместе с параметрами
+
+    Args:
+        spec: описание запуска
+        cache: каталог ResultCache (None - без кэша)
+    """
+    game = Game(spec['N'], spec['M'], model=spec['model'], alpha=spec['alpha'], c=spec['c'],
+                method=spec['method'], dens=spec['dens'], seed=spec['seed'], verbose=False, cache=cache)
+    summary = dict(game.solve(spec['dynamics']))
+    summary.update(spec)
+    return summary
+
+
+def seed_stream(seed, n_runs: int) -> list[int]:
+    """
+    Независимые воспроизводимые зерна для n_runs запусков
+
+    Args:
+        seed: базовое зерно ансамбля
+        n_runs: количество запусков
+    Returns:
+        Список 32-битных зерен (годятся для np.random.seed)
+    """
+    children = np.random.SeedSequence(seed).spawn(n_runs)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def run_specs(specs: list[dict], workers=None, chunksize=1, cache=None) -> list[dict]:
+    """
+    Выполняет запуски в пуле процессов
+
+    Args:
+        specs: описания запусков
+        workers: число процессов (None - по числу ядер, 1 - в текущем процессе)
+        chunksize: сколько запусков отдавать воркеру за раз
+        cache: каталог ResultCache (None - без кэша)
+    Returns:
+        Сводки в порядке specs
+    """
+    worker = partial(run_spec, cache=cache)
+    if workers == 1:
+        return [worker(spec) for spec in specs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(worker, specs, chunksize=chunksize))
+
+
+def run_ensemble(N: int, M: int, n_runs: int, model='mil1', alpha=2, c=None, method='erdos', dens=0.5, dynamics='by_one', seed=0, workers=None, chunksize=1, cache=None) -> list[dict]:
+    """
+    Запускает n_runs независимых реплик одной конфигурации
+
+    Args:
+        n_runs: количество реплик
+        seed: базовое зерно; зерна реплик порождаются через SeedSequence.spawn
+        workers: число процессов
+        cache: каталог ResultCache (None - без кэша)
+        остальные - как в make_spec
+    Returns:
+        Список сводок запусков
+    """
+    specs = [make_spec(N, M, model, alpha, c, method, dens, dynamics, run_seed)
+             for run_seed in seed_stream(seed, n_runs)]
+    return run_specs(specs, workers=workers, chunksize=chunksize, cache=cache)
+
+
+def aggregate(summaries: list[dict]) -> dict:
+    """
+    Агрегирует сводки ансамбля
+
+    Returns:
+        Словарь: доли исходов, статистики числа раундов до сходимости,
+        благосостояния и среднее распределение степеней идей
+    """
+    if not summaries:
+        return {}
+    outcomes = [summary['outcome'] for summary in summaries]
+    rounds = np.array([summary['rounds'] for summary in summaries], dtype=float)
+    converged = np.array([outcome == 'equilibrium' for outcome in outcomes])
+    welfare = np.array([summary['welfare'] for summary in summaries])
+    width = max(len(summary['degree_distribution']) for summary in summaries)
+    degrees = np.zeros(width)
+    for summary in summaries:
+        distribution = summary['degree_distribution']
+        degrees[:len(distribution)] += distribution
+    return {
+        'runs': len(summaries),
+        'outcome_rates': {outcome: outcomes.count(outcome) / len(outcomes) for outcome in set(outcomes)},
+        'mean_rounds': float(rounds.mean()),
+        'mean_rounds_to_convergence': float(rounds[converged].mean()) if converged.any() else None,
+        'std_rounds': float(rounds.std()),
+        'mean_welfare': float(welfare.mean()),
+        'std_welfare': float(welfare.std()),
+        'mean_degree_distribution': (degrees / len(summaries)).tolist(),
+    }
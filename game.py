@@ -1,28 +1,259 @@
 import numpy as np
 from copy import deepcopy
+import hashlib
 import itertools
 
 from agents_and_ideas import Agent, Idea
 from manager import GraphManager
 from agent_generator import AgentGenerator
+from cache import ResultCache
+from mean_field import TypeEngine
+from sync_engine import SyncEngine
+from async_engine import AsyncBatchEngine
+from stats import StatsTracker
+from neighborhoods import SampledSearch, make_search
+from population import hedges_matrix, population_utilities
 
 class Game:
-    def __init__(self, N: int, M: int, model='mil1', alpha=2, c={'mil1':1, 'mil10':0.2, 'mil00':0.05, 'mil01':1}, method = 'erdos', dens = 0.5):
+    def __init__(self, N: int, M: int, model='mil1', alpha=2, c={'mil1':1, 'mil10':0.2, 'mil00':0.05, 'mil01':1}, method = 'erdos', dens = 0.5, seed=None, verbose=True, cache=None, hedges=None, precomputed=None, system_options=None, progress=None, track_stats=False, search=None):
         """
         Инициализация игры
 
         Args:
             N: количество агентов
             M: количество идей
+            seed: зерно генератора агентов (и глобального np.random)
+            verbose: печатать ли ход динамики
+            cache: ResultCache или путь к каталогу кэша, который solve проверяет перед симуляцией
+            hedges: готовая начальная матрица hedges (N, M) вместо генерации
+            precomputed: структуры GraphManager.precompute для начального состояния
+            system_options: аргументы GraphManager (например, {'vectorized': False} - эталонный путь)
+            progress: функция, получающая словарь о каждом завершённом раунде
+            track_stats: вести StatsTracker (self.stats) с точкой временного ряда на каждый раунд
+            search: поиск хода агента для 'by_one' и 'anim' вместо find_best_move - объект
+                с методами best_move(agent) и round_finished(moved) или словарь аргументов NeighborhoodSearch
+                (с ключом 'samples' - SampledSearch, зерно по умолчанию seed)
         """
         self.N = N
         self.M = M
-        gen = AgentGenerator(N, M)
-        if method == 'erdos':
+        self.model = model
+        self.alpha = alpha
+        self.c = c
+        self.seed = seed
+        self.verbose = verbose
+        self.rounds = 0
+        self.outcome = None
+        self.cache = ResultCache(cache) if isinstance(cache, str) else cache
+        self.precomputed = precomputed
+        self.system_options = system_options or {}
+        self.progress = progress
+        self.track_stats = track_stats
+        self.stats = None
+        if isinstance(search, dict):
+            search = make_search({'seed': seed, **search} if 'samples' in search else search)
+        self.search = search
+        gen = AgentGenerator(N, M, seed)
+        if hedges is not None:
+            self.agents = {Agent(list(map(int, row)), i, model, alpha, c) for i, row in enumerate(hedges)}
+        elif method == 'erdos':
             self.agents = gen.generate_random_agents(model=model, alpha=alpha, c = c)
         elif method == 'dens':
             self.agents = gen.generate_uniform_density_agents(model=model, alpha=alpha, c = c, density=dens)
 
+    @classmethod
+    def from_hedges(cls, hedges, model='mil1', alpha=2, c={'mil1':1, 'mil10':0.2, 'mil00':0.05, 'mil01':1}, verbose=True, cache=None, precomputed=None):
+        """
+        Игра с заданной начальной матрицей hedges
+
+        Args:
+            hedges: матрица (N, M), строка i - агент с id i
+            precomputed: структуры GraphManager.precompute для этой матрицы
+        """
+        hedges = np.asarray(hedges)
+        return cls(hedges.shape[0], hedges.shape[1], model=model, alpha=alpha, c=c, verbose=verbose,
+                   cache=cache, hedges=hedges, precomputed=precomputed)
+
+    def _make_system(self, fresh_stats=True) -> GraphManager:
+        """
+        Создаёт GraphManager с агентами игры; готовые структуры используются, пока состояние начальное
+
+        Args:
+            fresh_stats: начать новую статистику с точкой 0; иначе текущая статистика
+                подключается к системе, и её ряды продолжаются
+        """
+        system = GraphManager(**self.system_options)
+        system.add_agents(self.agents, precomputed=self.precomputed)
+        if self.track_stats:
+            if fresh_stats or self.stats is None:
+                self.stats = StatsTracker()
+                self.stats.attach(system)
+                self.stats.record(0)
+            else:
+                self.stats.attach(system)
+        return system
+
+    def _adopt(self, hedges: np.ndarray) -> GraphManager:
+        """
+        Переносит итоговую матрицу движка в hedges агентов и строит систему сразу
+        по итоговому состоянию, без пересчёта начального и поштучных Idea.invert
+        """
+        for agent in self.agents:
+            agent.hedges = hedges[agent.identifier].tolist()
+        return self._make_system(fresh_stats=False)
+
+    def _engine_report(self, state):
+        """
+        Готовит отчёты о раундах движка (SyncEngine, AsyncBatchEngine, TypeEngine):
+        при track_stats статистика начинается с текущего состояния движка, а после
+        каждого раунда пересчитывается по нему целиком и передаётся в _report
+
+        Args:
+            state: функция без аргументов -> (матрица hedges, полезности по возрастанию id) движка
+        Returns:
+            Обратный вызов (раунд, равновесие) для run движка или None, если отчёты не нужны
+        """
+        if self.track_stats:
+            hedges, utilities = state()
+            self.stats = StatsTracker()
+            self.stats.load(hedges, utilities)
+            self.stats.record(0)
+        elif self.progress is None:
+            return None
+
+        def report(raund, flag):
+            hedges, utilities = state()
+            if self.stats is not None:
+                self.stats.load(hedges, utilities)
+            self._report(raund, flag, welfare=float(np.sum(utilities)))
+        return report
+
+    def _round_state(self):
+        """
+        Отпечаток состояния в начале асинхронного раунда для поиска циклов
+
+        Returns:
+            Дайджест hedges всех агентов или None, если раунд недетерминирован
+            (случайная выборка ходов) и повтор состояния не означает цикла
+        """
+        if isinstance(self.search, SampledSearch):
+            return None
+        snapshot = np.array([agent.hedges for agent in self.agents], dtype=np.uint8)
+        return hashlib.blake2b(snapshot.tobytes(), digest_size=16).digest()
+
+    def _report(self, raund: int, flag: bool, welfare=None):
+        """
+        Сообщает progress о завершённом раунде: номер, равновесие и благосостояние; пишет точку статистики
+
+        Args:
+            welfare: благосостояние, если полезности агентов не обновляются по ходу (движки)
+        """
+        if self.stats is not None:
+            self.stats.record(raund)
+        if self.progress is not None:
+            if welfare is None:
+                welfare = self.stats.welfare if self.stats is not None else sum(agent.U for agent in self.agents)
+            self.progress({'round': raund, 'equilibrium': bool(flag), 'welfare': float(welfare)})
+
+    def run(self, dynamics='by_one'):
+        """
+        Запускает динамику по имени
+
+        Args:
+            dynamics: 'by_one' (evolve_anim_by_one), 'anim' (evolve_anim), 'sim' (evolve_sim),
+                'types' (evolve_types), 'sync' (evolve_sync) или 'batch' (evolve_batch)
+        Returns:
+            snapshots, edge_changes, utilities, flagss как у соответствующего метода;
+            после запуска заполнены self.rounds и self.outcome
+        """
+        if dynamics == 'by_one':
+            return self.evolve_anim_by_one()
+        elif dynamics == 'anim':
+            return self.evolve_anim()
+        elif dynamics == 'sim':
+            return self.evolve_sim()
+        elif dynamics == 'types':
+            return self.evolve_types()
+        elif dynamics == 'sync':
+            return self.evolve_sync()
+        elif dynamics == 'batch':
+            return self.evolve_batch()
+        raise ValueError(f"Неизвестная динамика: {dynamics}")
+
+    def hedges_matrix(self) -> np.ndarray:
+        """Текущая матрица hedges, строки по возрастанию id агентов"""
+        return hedges_matrix(self.agents)
+
+    def summary(self) -> dict:
+        """
+        Компактная сводка завершённого запуска вместо полной траектории
+
+        Returns:
+            Словарь: число раундов, исход (equilibrium/cycle/limit), итоговые полезности
+            агентов (по возрастанию id), благосостояние и распределение степеней идей
+        """
+        agents = sorted(self.agents, key=lambda agent: agent.identifier)
+        degrees = self.hedges_matrix().sum(axis=0)
+        utilities = [float(agent.U) for agent in agents]
+        return {
+            'rounds': self.rounds,
+            'outcome': self.outcome,
+            'utilities': utilities,
+            'welfare': float(sum(utilities)),
+            'degree_distribution': np.bincount(degrees, minlength=self.N + 1).tolist(),
+        }
+
+    def _cache_options(self) -> dict | None:
+        """
+        Настройки запуска для ключа кэша помимо hedges, модели, c, alpha и динамики
+
+        Returns:
+            Настройки GraphManager (со значениями по умолчанию) и поиска хода;
+            None, если поиск не воспроизводим и запуск нельзя кэшировать
+        """
+        vectorized = self.system_options.get('vectorized', True)
+        system = {'vectorized': vectorized, 'distance_engine': 'integer' if vectorized else 'scipy'}
+        system.update({key: value for key, value in self.system_options.items() if value is not None})
+        search = None
+        if self.search is not None:
+            config = getattr(self.search, 'config', None)
+            search = config() if config is not None else None
+            if search is None:
+                return None
+        return {'system': system, 'search': search}
+
+    def solve(self, dynamics='by_one') -> dict:
+        """
+        Доводит игру до конца и возвращает сводку, используя кэш, если он задан
+
+        При попадании в кэш симуляция не выполняется: агентам выставляются
+        сохранённые итоговые hedges и полезности. Запуски с невоспроизводимым
+        поиском хода (SampledSearch без зерна) не кэшируются.
+
+        Args:
+            dynamics: имя динамики для run
+        Returns:
+            Сводка как у summary
+        """
+        options = self._cache_options()
+        if self.cache is None or options is None:
+            self.run(dynamics)
+            return self.summary()
+        agents = sorted(self.agents, key=lambda agent: agent.identifier)
+        model = agents[0].model
+        key = ResultCache.make_key(self.hedges_matrix(), model, self.c[model], self.alpha, dynamics, options)
+        entry = self.cache.get(key)
+        if entry is not None:
+            for agent, row, utility in zip(agents, entry['final_hedges'], entry['utilities']):
+                agent.hedges = row.tolist()
+                agent.U = float(utility)
+            self.rounds = entry['summary']['rounds']
+            self.outcome = entry['summary']['outcome']
+            return entry['summary']
+        self.run(dynamics)
+        summary = self.summary()
+        self.cache.put(key, self.hedges_matrix(), summary['utilities'], summary)
+        return summary
+
     # Вспомогательные функции для анализа
     def analyze_agents(self):
         """
@@ -77,18 +308,17 @@ class Game:
         print(f"  Мин/макс расстояние Хэмминга: {analysis['min_hamming_distance']}/{analysis['max_hamming_distance']}")
         print(f"  Плотность по позициям: {[f'{d:.2f}' for d in analysis['position_densities']]}")
     def evolve_sim(self):
-        system = GraphManager()
-
         # Добавляем агентов в систему
-        system.add_agents(self.agents)
+        system = self._make_system()
 
-        print("\n" + "=" * 50)
-        print("Состояние агентов:")
-        for agent in list(self.agents):
-            print(f"{agent}")
+        if self.verbose:
+            print("\n" + "=" * 50)
+            print("Состояние агентов:")
+            for agent in list(self.agents):
+                print(f"{agent}")
 
-        print("\n" + "=" * 50)
-        print("Пошаговое изменение")
+            print("\n" + "=" * 50)
+            print("Пошаговое изменение")
         snapshots = []
         edge_changes = []
         utilities = []
@@ -104,7 +334,8 @@ class Game:
             utilities.append([agent.U for agent in self.agents])
             flagss.append(flag)
             temp_flag = True
-            print(f'раунд {raund}')
+            if self.verbose:
+                print(f'раунд {raund}')
             origin_adj = system.adj_matrix()
             strategy_applied = {}
             for agent in list(self.agents):
@@ -125,13 +356,17 @@ class Game:
             flag = temp_flag
             #system._update_ideas()
             system.update_utilities()
+            self._report(raund, flag)
             raund += 1
 
-        print("\n" + "=" * 50)
-        if flag:
-            print("Типа равновесие:")
-        elif cycle_flag:
-            print("Цикл")
+        if self.verbose:
+            print("\n" + "=" * 50)
+            if flag:
+                print("Типа равновесие:")
+            elif cycle_flag:
+                print("Цикл")
+        self.rounds = raund - 1
+        self.outcome = 'equilibrium' if flag else 'cycle' if cycle_flag else 'limit'
         # Добавим последний снимок после финального состояния
         final_snapshot = np.array([agent.hedges[:] for agent in self.agents])
         snapshots.append(final_snapshot)
@@ -140,10 +375,8 @@ class Game:
         flagss.append(flag)
         return snapshots, edge_changes, utilities, flagss
     def evolve(self):
-        system = GraphManager()
-
         # Добавляем агентов в систему
-        system.add_agents(self.agents)
+        system = self._make_system()
 
         print("\n" + "=" * 50)
         print("Состояние агентов:")
@@ -197,16 +430,22 @@ class Game:
         - snapshots: список матриц (numpy.ndarray), где каждая строка — это hedges одного агента
         - edge_changes: список множеств изменённых рёбер (кортежи (агент, идея))
         """
-        system = GraphManager()
-
         # Добавляем агентов в систему
-        system.add_agents(self.agents)
+        system = self._make_system()
         snapshots = []
         edge_changes = []
         utilities = []
         flagss = []
         flag = False
-        while not flag:
+        seen = set()
+        cycle_flag = False
+        raund = 0
+        while not flag and raund < 500*self.N and not cycle_flag:
+            raund += 1
+            # Раунд детерминирован: повтор состояния в его начале означает цикл
+            state = self._round_state()
+            cycle_flag = state is not None and state in seen
+            seen.add(state)
             # Сохраняем текущее состояние
             changed_edges = set()
             snapshot = np.array([agent.hedges[:] for agent in self.agents])
@@ -217,7 +456,7 @@ class Game:
 
             for agent in self.agents:
                 original = agent.hedges[:]
-                if agent.make_best_move():
+                if agent.make_best_move(self.search):
                     temp_flag = False
                     #all_ideas = system.get_all_ideas()
                     #for ididea, idea in all_ideas.items():
@@ -227,8 +466,11 @@ class Game:
                             changed_edges.add((f"A{agent.identifier}", f"I{i}", after - before))
 
             edge_changes.append(changed_edges)
-            flag = temp_flag
+            flag = temp_flag if self.search is None else self.search.round_finished(not temp_flag)
+            self._report(raund, flag)
 
+        self.rounds = raund
+        self.outcome = 'equilibrium' if flag else 'cycle' if cycle_flag else 'limit'
         # Добавим последний снимок после финального состояния
         final_snapshot = np.array([agent.hedges[:] for agent in self.agents])
         snapshots.append(final_snapshot)
@@ -242,10 +484,8 @@ class Game:
         - snapshots: список матриц (numpy.ndarray), где каждая строка — это hedges одного агента
         - edge_changes: список множеств изменённых рёбер (кортежи (агент, идея))
         """
-        system = GraphManager()
-
         # Добавляем агентов в систему
-        system.add_agents(self.agents)
+        system = self._make_system()
         snapshots = []
         edge_changes = []
         utilities = []
@@ -255,17 +495,24 @@ class Game:
         edge_changes.append(set())
         flag = False
         flagss = [flag]
+        seen = set()
+        cycle_flag = False
         raund = 0
-        while not flag and raund < 500*self.N:
+        while not flag and raund < 500*self.N and not cycle_flag:
             # Сохраняем текущее состояние
             raund += 1
-            print(f"Раунд {raund}")
+            # Раунд детерминирован: повтор состояния в его начале означает цикл
+            state = self._round_state()
+            cycle_flag = state is not None and state in seen
+            seen.add(state)
+            if self.verbose:
+                print(f"Раунд {raund}")
             temp_flag = True
 
             for agent in self.agents:
                 original = agent.hedges[:]
                 changed_edges = set()
-                if agent.make_best_move():
+                if agent.make_best_move(self.search):
                     temp_flag = False
                     #all_ideas = system.get_all_ideas()
                     #for ididea, idea in all_ideas.items():
@@ -278,8 +525,11 @@ class Game:
                         if before != after:
                             changed_edges.add((f"A{agent.identifier}", f"I{i}", after - before))
                     edge_changes.append(changed_edges)
-            flag = temp_flag
+            flag = temp_flag if self.search is None else self.search.round_finished(not temp_flag)
+            self._report(raund, flag)
 
+        self.rounds = raund
+        self.outcome = 'equilibrium' if flag else 'cycle' if cycle_flag else 'limit'
         system.adj_matrix()
         # Добавим последний снимок после финального состояния
         final_snapshot = np.array([agent.hedges[:] for agent in self.agents])
@@ -287,4 +537,75 @@ class Game:
         utilities.append([agent.U for agent in self.agents])
         edge_changes.append(set())
         flagss.append(flag)
-        return snapshots, edge_changes, utilities, flagss
\ No newline at end of file
+        return snapshots, edge_changes, utilities, flagss
+    def evolve_types(self):
+        """
+        Асинхронная динамика на типах агентов (TypeEngine), только для mil1 и mil10
+
+        Возвращает те же четыре списка, что evolve_anim, но лишь с начальным
+        и финальным снимком: промежуточные состояния на типах не восстанавливаются.
+        """
+        agents = list(self.agents)
+        model = agents[0].model
+        snapshot = np.array([agent.hedges[:] for agent in agents])
+        hedges = self.hedges_matrix()
+        initial = population_utilities(hedges, model, agents[0].c, agents[0].alpha)
+        initial_utilities = [initial[agent.identifier].item() for agent in agents]
+
+        engine = TypeEngine(hedges, model=model, c=agents[0].c, alpha=agents[0].alpha)
+        if self.verbose:
+            print(f"Типов: {engine.n_types()} на {self.N} агентов")
+        engine.run(callback=self._engine_report(lambda: (engine.expand(), engine.agent_utilities())))
+        self._adopt(engine.expand())
+
+        self.rounds = engine.rounds
+        self.outcome = engine.outcome
+        flag = engine.outcome == 'equilibrium'
+        final_snapshot = np.array([agent.hedges[:] for agent in agents])
+        changed_edges = set()
+        for row, i in zip(*np.nonzero(final_snapshot != snapshot)):
+            changed_edges.add((f"A{agents[row].identifier}", f"I{i}", int(final_snapshot[row, i] - snapshot[row, i])))
+        return ([snapshot, final_snapshot], [changed_edges, set()],
+                [initial_utilities, [agent.U for agent in agents]], [False, flag])
+
+    def evolve_sync(self):
+        """
+        Синхронная динамика для любой модели (SyncEngine): все агенты отвечают
+        на замороженное состояние матричными операциями, ходы применяются вместе.
+
+        Для mil01 кандидат оценивается на графе, где у агента заменены и строка,
+        и столбец смежности (в simultaneous_move обновляется только строка).
+        Возвращает то же, что evolve_sim; строки снимков идут в порядке обхода self.agents.
+        """
+        agents = list(self.agents)
+        engine = SyncEngine(self.hedges_matrix(), model=agents[0].model, c=agents[0].c, alpha=agents[0].alpha)
+        order = [agent.identifier for agent in agents]
+        callback = self._engine_report(lambda: (engine.B, engine.utilities()))
+        snapshots, edge_changes, utilities, flagss = engine.run(order=order, callback=callback)
+        if self.verbose:
+            print(f"Раундов: {engine.rounds}, исход: {engine.outcome}")
+
+        self._adopt(engine.B)
+        self.rounds = engine.rounds
+        self.outcome = engine.outcome
+        return snapshots, edge_changes, utilities, flagss
+
+    def evolve_batch(self):
+        """
+        Асинхронная динамика evolve_anim пакетами независимых агентов (AsyncBatchEngine):
+        ответы пакета считаются матричными операциями, результат совпадает с
+        последовательными ходами в некотором порядке обхода.
+        Возвращает то же, что evolve_anim; строки снимков идут в порядке обхода self.agents.
+        """
+        agents = list(self.agents)
+        engine = AsyncBatchEngine(self.hedges_matrix(), model=agents[0].model, c=agents[0].c, alpha=agents[0].alpha)
+        order = [agent.identifier for agent in agents]
+        callback = self._engine_report(lambda: (engine.B, engine.utilities()))
+        snapshots, edge_changes, utilities, flagss = engine.run(order=order, callback=callback)
+        if self.verbose:
+            print(f"Раундов: {engine.rounds}, пакетов: {engine.batches}, исход: {engine.outcome}")
+
+        self._adopt(engine.B)
+        self.rounds = engine.rounds
+        self.outcome = engine.outcome
+        return snapshots, edge_changes, utilities, flagss
@@ -0,0 +1,140 @@
+import numpy as np
+import time
+
+from ensemble import DEFAULT_COEFS
+from game import Game
+
+
+# Настройки GraphManager для сравниваемых реализаций
+ENGINES = {
+    'reference': {'vectorized': False},
+    'vectorized': {'vectorized': True, 'distance_engine': 'scipy'},
+    'integer': {'vectorized': True, 'distance_engine': 'integer'},
+}
+# Эталонная динамика, доступная для модели
+REFERENCE_DYNAMICS = {'mil1': 'by_one', 'mil10': 'by_one', 'mil00': 'by_one', 'mil01': 'sim'}
+
+
+def _runner(engine, dynamics: str):
+    """Функция game -> траектория для имени из ENGINES, словаря настроек GraphManager или готовой функции"""
+    if callable(engine):
+        return engine
+    options = ENGINES[engine] if isinstance(engine, str) else engine
+
+    def run(game: Game):
+        game.system_options = dict(options)
+        return game.run(dynamics)
+    return run
+
+
+def compare_trajectories(reference, candidate, atol=0.0) -> dict | None:
+    """
+    Пошагово сравнивает две траектории формата Game.run
+
+    Сравниваются снимки hedges, наборы изменённых рёбер (последовательность ходов
+    с учётом выбора при равных приростах), полезности (с допуском atol, по умолчанию
+    до бита: векторные полезности суммируются в порядке Agent.utility) и флаги равновесия.
+
+    Returns:
+        None, если траектории совпадают, иначе описание первого расхождения
+    """
+    ref_snapshots, ref_edges, ref_utilities, ref_flags = reference
+    snapshots, edges, utilities, flags = candidate
+    for step in range(min(len(ref_snapshots), len(snapshots))):
+        if not np.array_equal(ref_snapshots[step], snapshots[step]):
+            return {'step': step, 'field': 'snapshot',
+                    'cells': np.argwhere(np.asarray(ref_snapshots[step]) != np.asarray(snapshots[step])).tolist()}
+        if ref_edges[step] != edges[step]:
+            return {'step': step, 'field': 'moves', 'reference': sorted(ref_edges[step]), 'candidate': sorted(edges[step])}
+        if not np.allclose(ref_utilities[step], utilities[step], rtol=0, atol=atol):
+            diff = np.abs(np.asarray(ref_utilities[step]) - np.asarray(utilities[step]))
+            return {'step': step, 'field': 'utilities', 'max_abs_diff': float(diff.max())}
+        if bool(ref_flags[step]) != bool(flags[step]):
+            return {'step': step, 'field': 'flag', 'reference': ref_flags[step], 'candidate': flags[step]}
+    if len(ref_snapshots) != len(snapshots):
+        return {'step': min(len(ref_snapshots), len(snapshots)), 'field': 'length',
+                'reference': len(ref_snapshots), 'candidate': len(snapshots)}
+    return None
+
+
+def default_coefs(N: int) -> list[dict]:
+    """Наборы коэффициентов для проверки: DEFAULT_COEFS и коэффициенты main.py (mil01: 1/N)"""
+    return [dict(DEFAULT_COEFS), {**DEFAULT_COEFS, 'mil01': 1 / N}]
+
+
+def differential_check(candidate='integer', reference='reference', models=('mil1', 'mil10', 'mil00', 'mil01'),
+                       seeds=range(5), N=12, M=6, c=None, alpha=2, method=('erdos', 'dens'), dens=0.5, dynamics=None,
+                       atol=0.0) -> list[dict]:
+    """
+    Запускает эталон и альтернативную реализацию на одних и тех же популяциях
+
+    Args:
+        candidate: имя из ENGINES, словарь настроек GraphManager или функция game -> траектория
+        reference: то же для эталона
+        models: модели для проверки
+        seeds: зерна популяций
+        N, M, alpha, dens: параметры Game
+        c: словарь коэффициентов или список словарей (по умолчанию default_coefs(N));
+            для каждой модели проверяются её различные коэффициенты
+        method: способ генерации или список способов
+        dynamics: динамика для обеих реализаций (по умолчанию REFERENCE_DYNAMICS)
+        atol: допуск для полезностей
+    Returns:
+        Список отчётов: модель, коэффициент, способ генерации, зерно, время обеих
+        реализаций, ускорение и первое расхождение
+    """
+    coef_sets = default_coefs(N) if c is None else [c] if isinstance(c, dict) else list(c)
+    methods = [method] if isinstance(method, str) else list(method)
+    reports = []
+    for model in models:
+        model_dynamics = dynamics or REFERENCE_DYNAMICS[model]
+        run_reference = _runner(reference, model_dynamics)
+        run_candidate = _runner(candidate, model_dynamics)
+        # Наборы, отличающиеся только коэффициентами других моделей, дают те же запуски
+        model_coefs = list({coefs[model]: dict(coefs) for coefs in coef_sets}.values())
+        for coefs in model_coefs:
+            for generation in methods:
+                for seed in seeds:
+                    timings = []
+                    trajectories = []
+                    for run in (run_reference, run_candidate):
+                        game = Game(N, M, model=model, alpha=alpha, c=coefs, method=generation, dens=dens, seed=seed,
+                                    verbose=False)
+                        start = time.perf_counter()
+                        trajectories.append(run(game))
+                        timings.append(time.perf_counter() - start)
+                    reports.append({
+                        'model': model,
+                        'c': coefs[model],
+                        'method': generation,
+                        'seed': seed,
+                        'dynamics': model_dynamics,
+                        'steps': len(trajectories[0][0]),
+                        'reference_time': timings[0],
+                        'candidate_time': timings[1],
+                        'speedup': timings[0] / timings[1] if timings[1] > 0 else float('inf'),
+                        'mismatch': compare_trajectories(trajectories[0], trajectories[1], atol=atol),
+                    })
+    return reports
+
+
+def assert_equivalent(*args, **kwargs) -> list[dict]:
+    """differential_check, который бросает AssertionError при первом расхождении"""
+    reports = differential_check(*args, **kwargs)
+    for report in reports:
+        if report['mismatch'] is not None:
+            raise AssertionError(f"{report['model']} (c={report['c']}, {report['method']}), зерно {report['seed']}: "
+                                 f"{report['mismatch']}")
+    return reports
+
+
+def print_reports(reports: list[dict]):
+    """Печатает сводку по моделям: число совпавших запусков и среднее ускорение"""
+    for model in dict.fromkeys(report['model'] for report in reports):
+        rows = [report for report in reports if report['model'] == model]
+        matched = sum(report['mismatch'] is None for report in rows)
+        speedup = np.mean([report['speedup'] for report in rows])
+        print(f"{model}: совпало {matched}/{len(rows)}, ускорение x{speedup:.2f}")
+        for report in rows:
+            if report['mismatch'] is not None:
+                print(f"  c={report['c']}, {report['method']}, зерно {report['seed']}: {report['mismatch']}")
@@ -1,22 +1,51 @@
 import numpy as np
 from copy import deepcopy
 import itertools
-from scipy.sparse import csr_matrix
-from scipy.sparse.csgraph import floyd_warshall, shortest_path
 
 
 from agents_and_ideas import Agent, Idea
+from population import hedges_matrix, neighbour_counts, population_utilities
+from distances import dial_sssp, integer_weights, layered_apsp, to_float
 
 
 
 class GraphManager:
     """Общий класс-контейнер для управления всеми агентами и идеями"""
 
-    def __init__(self):
+    def __init__(self, vectorized=True, distance_engine=None, comembership=False):
+        """
+        Args:
+            vectorized: считать полезности всей популяции матричными операциями
+                (False - поагентно через Agent.utility, эталонный путь)
+            distance_engine: 'integer' (целочисленные расстояния, distances.py) или 'scipy';
+                по умолчанию 'integer' при vectorized и 'scipy' иначе
+            comembership: поддерживать C = B·Bᵀ обновлениями ранга один (только при vectorized).
+                Выключено по умолчанию: в переборе ходов каждое пробное изменение стоит
+                обновления строки и столбца C, и для mil00 это медленнее, чем считать соседей
+                по множествам агентов идей; без C числа соседей для всей популяции считаются по B
+        """
         self.agents: set[Agent] = set()
         self.ideas: dict[int, Idea] = {}
         self.N = None
         self.M = None
+        self.vectorized = vectorized
+        if distance_engine is None:
+            distance_engine = 'integer' if vectorized else 'scipy'
+        self.distance_engine = distance_engine
+        self.comembership = comembership
+        # Постоянные структуры (только при vectorized): матрица hedges B, степени идей,
+        # матрица совместного участия C = B·Bᵀ (при comembership) и веса рёбер
+        # (минимальная степень общей идеи)
+        self.B = None
+        self.C = None
+        self.degrees = None
+        self._weights = None
+        self._dirty_ideas: set[int] = set()
+        self._dirty_agents: set[int] = set()
+        # dist_matrix соответствует текущему состоянию (сбрасывается при любом изменении)
+        self._dist_valid = False
+        # Статистика stats.StatsTracker, обновляемая по каждому изменению (None - не ведётся)
+        self.stats = None
 
     def add_agent(self, agent: 'Agent'):
         """Добавляет агента в систему"""
@@ -25,16 +54,108 @@ class GraphManager:
         self._update_ideas()
         self.update_utilities()
 
-    def add_agents(self, agents: set['Agent']):
-        """Добавляет множество агентов"""
+    def add_agents(self, agents: set['Agent'], precomputed: dict = None):
+        """
+        Добавляет множество агентов
+
+        Args:
+            agents: агенты
+            precomputed: структуры из GraphManager.precompute для тех же hedges;
+                используются вместо пересчёта B, C, весов и расстояний
+        """
         for agent in agents:
             agent._system = self
         self.agents.update(agents)
         self.N = len(self.agents)
+        if precomputed is not None and self.vectorized and self.B is None:
+            self._load_precomputed(precomputed)
         self._update_ideas()
-        self.shortest()
+        if not self.vectorized or any(agent.model == 'mil01' for agent in self.agents):
+            if not self._dist_valid:
+                self.shortest()
         self.update_utilities()
 
+    @staticmethod
+    def precompute(hedges: np.ndarray, with_dist=False, comembership=False) -> dict:
+        """
+        Считает общие структуры для начального состояния один раз, чтобы
+        несколько систем с теми же hedges (например, разные модели) их переиспользовали
+
+        Args:
+            hedges: матрица hedges (N, M), строка i - агент с id i
+            with_dist: считать ли матрицу кратчайших расстояний (нужна mil01)
+            comembership: считать ли C = B·Bᵀ (нужна только системам с comembership=True)
+        Returns:
+            Словарь с B, C (None без comembership), degrees, weights и, при with_dist, dist
+        """
+        B = np.array(hedges, dtype=np.uint8)
+        N = len(B)
+        system = GraphManager()
+        system.N = N
+        system.B = B
+        system.degrees = B.sum(axis=0, dtype=np.int64)
+        system.C = GraphManager._comembership_matrix(B) if comembership else None
+        system._weights = np.full((N, N), np.inf)
+        system._dirty_agents = set(range(N))
+        system._refresh_weights()
+        result = {'B': B, 'C': system.C, 'degrees': system.degrees, 'weights': system._weights}
+        if with_dist:
+            result['dist'] = layered_apsp(B, system.degrees)
+        return result
+
+    @staticmethod
+    def perturb(precomputed: dict, flips, with_dist=False) -> dict:
+        """
+        Структуры precompute для состояния, отличающегося от precomputed['B'] несколькими
+        изменениями принадлежности: копии исходных структур с обновлениями ранга один
+        вместо полного пересчёта (исходный словарь не меняется)
+
+        Args:
+            precomputed: результат GraphManager.precompute
+            flips: пары (агент, идея), принадлежность которых инвертируется
+            with_dist: считать ли матрицу кратчайших расстояний нового состояния
+        Returns:
+            Словарь того же вида, что у precompute
+        """
+        system = GraphManager()
+        system.B = precomputed['B'].copy()
+        system.N = len(system.B)
+        system.C = precomputed['C'].copy() if precomputed['C'] is not None else None
+        system.degrees = precomputed['degrees'].copy()
+        system._weights = precomputed['weights'].copy()
+        for i, idea_id in flips:
+            system._flip(i, idea_id, added=system.B[i, idea_id] == 0)
+        system._refresh_weights()
+        result = {'B': system.B, 'C': system.C, 'degrees': system.degrees, 'weights': system._weights}
+        if with_dist:
+            result['dist'] = layered_apsp(system.B, system.degrees)
+        return result
+
+    @staticmethod
+    def _comembership_matrix(B: np.ndarray) -> np.ndarray:
+        """C = B·Bᵀ: число общих идей у каждой пары агентов"""
+        Bf = B.astype(np.float32)
+        return np.rint(Bf @ Bf.T).astype(np.int32)
+
+    def _load_precomputed(self, precomputed: dict):
+        """Берёт копии готовых структур, если они построены для текущих hedges"""
+        if sorted(agent.identifier for agent in self.agents) != list(range(self.N)):
+            return
+        if not np.array_equal(hedges_matrix(self.agents), precomputed['B']):
+            return
+        if self.comembership and precomputed['C'] is None:
+            return
+        self.B = precomputed['B'].copy()
+        self.C = precomputed['C'].copy() if self.comembership else None
+        self.degrees = precomputed['degrees'].copy()
+        weights = precomputed.get('weights')
+        self._weights = weights.copy() if weights is not None else None
+        self._dirty_ideas = set()
+        self._dirty_agents = set()
+        if 'dist' in precomputed:
+            self.dist_matrix = precomputed['dist'].copy()
+            self._dist_valid = True
+
     def _update_ideas(self):
         """Обновляет все идеи после изменения агентов"""
         if not self.agents:
@@ -50,15 +171,135 @@ class GraphManager:
             else:
                 self.ideas[i].update_agents(self.agents)
         self.M = len(self.ideas)
+        if self.vectorized:
+            self._rebuild_structures()
+
+    def _rebuild_structures(self):
+        """Пересобирает B, C и степени с нуля, если hedges разошлись с B; веса строятся при первом обращении"""
+        self.N = len(self.agents)
+        if sorted(agent.identifier for agent in self.agents) != list(range(self.N)):
+            # Индексация строк по id возможна только для id 0..N-1
+            self.B = self.C = self.degrees = self._weights = None
+            return
+        B = hedges_matrix(self.agents)
+        if self.B is not None and self.B.shape == B.shape and np.array_equal(self.B, B):
+            return
+        self.B = B
+        self._dist_valid = False
+        self.degrees = B.sum(axis=0, dtype=np.int64)
+        if self.comembership:
+            self.C = self._comembership_matrix(B)
+        self._weights = None
+        self._dirty_ideas = set()
+        self._dirty_agents = set()
+
+    def on_invert(self, agent: Agent, idea_id: int, added: bool):
+        """
+        Поддерживает B, C и степени после того, как Idea.invert добавил или убрал агента:
+        одно изменение (агент, идея) - это обновление ранга один строки и столбца C
+
+        Args:
+            agent: агент
+            idea_id: идентификатор идеи
+            added: True, если агент добавлен в идею
+        """
+        self._dist_valid = False
+        if self.stats is not None:
+            self.stats.on_invert(agent, idea_id, added)
+        if self.B is None:
+            return
+        self._flip(agent.identifier, idea_id, added)
+
+    def _flip(self, i: int, idea_id: int, added: bool):
+        """Обновление B, степеней и (если поддерживается) ранга один C для изменения (агент i, идея)"""
+        sign = 1 if added else -1
+        if self.C is not None:
+            if added:
+                column = self.B[:, idea_id].astype(np.int32)
+            else:
+                self.B[i, idea_id] = 0
+                column = self.B[:, idea_id].astype(np.int32)
+            self.C[i, :] += sign * column
+            self.C[:, i] += sign * column
+            self.C[i, i] += sign
+        self.B[i, idea_id] = 1 if added else 0
+        self.degrees[idea_id] += sign
+        # Веса пересчитываются лениво: смена степени идеи задевает все пары её участников
+        self._dirty_ideas.add(idea_id)
+        self._dirty_agents.add(i)
+
+    def _edge_weights(self) -> np.ndarray:
+        """
+        Веса рёбер агентов (минимальная степень общей идеи, inf - нет общих идей)
+
+        Матрица N x N выделяется и заполняется при первом обращении (adj_matrix и
+        расстояния через scipy): mil1, mil10 и mil00 её не читают. Дальше
+        обновляются только строки, задетые изменениями.
+        """
+        if self._weights is None:
+            self._weights = np.full((self.N, self.N), np.inf)
+            self._dirty_ideas = set()
+            self._dirty_agents = set(range(self.N))
+        self._refresh_weights()
+        return self._weights
+
+    def _refresh_weights(self, chunk_size=64):
+        """Пересчитывает строки и столбцы весов для агентов, задетых изменениями"""
+        if self._weights is None:
+            return
+        rows = set(self._dirty_agents)
+        for idea_id in self._dirty_ideas:
+            rows.update(np.flatnonzero(self.B[:, idea_id]).tolist())
+        self._dirty_ideas = set()
+        self._dirty_agents = set()
+        if not rows:
+            return
+        rows = np.array(sorted(rows))
+        held = self.B == 1
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            values = np.where(held[chunk], self.degrees, np.inf)
+            shared = held[None, :, :] & held[chunk][:, None, :]
+            block = np.where(shared, values[:, None, :], np.inf).min(axis=2)
+            block[np.arange(len(chunk)), chunk] = np.inf
+            self._weights[chunk, :] = block
+            self._weights[:, chunk] = block.T
+
+    def neighbour_counts(self) -> np.ndarray:
+        """Число агентов, делящих с каждым агентом хотя бы одну идею (включая его самого)"""
+        if self.C is not None:
+            return np.count_nonzero(self.C, axis=1)
+        if self.B is None:
+            raise ValueError("Числа соседей по матрице доступны только при vectorized=True")
+        return neighbour_counts(self.B)
+
     def update_utilities(self):
         """
         Обновляет поле U у всех агентов значениями рассчитанной полезности
         """
-        self.shortest()
+        params = {(agent.model, agent.c, agent.alpha) for agent in self.agents}
+        if not self.vectorized or len(params) != 1:
+            self.shortest()
+            for agent in self.agents:
+                agent.U = agent.utility()
+            return
+        model, c, alpha = params.pop()
+        dist = None
+        if model == 'mil01':
+            if not (self._dist_valid and self.B is not None):
+                self.shortest()
+            dist = self.dist_matrix
+        if self.B is not None:
+            neighbours = self.neighbour_counts() if model == 'mil00' else None
+            utilities = population_utilities(self.B, model, c, alpha, dist=dist, neighbours=neighbours)
+        else:
+            utilities = population_utilities(hedges_matrix(self.agents), model, c, alpha, dist=dist)
         for agent in self.agents:
-            agent.U = agent.utility()
+            agent.U = utilities[agent.identifier].item()
     def adj_matrix(self):
         """Возвращает матрицу смежности агентов с весом ребра = степень идеи"""
+        if self.B is not None:
+            return self._edge_weights().copy()
         matrix = np.zeros((self.N, self.N))
         matrix += self.N*2
         done_agents = set()
@@ -102,14 +343,28 @@ class GraphManager:
         return matrix
     def shortest(self):
         """находит кратчайшие пути для каждой пары агентов, записывает матрицу расстояний в self.dist_matrix"""
+        if self.distance_engine == 'integer' and self.B is not None:
+            # Целые расстояния с меткой недостижимости (см. distances.to_float)
+            self.dist_matrix = layered_apsp(self.B, self.degrees)
+            self._dist_valid = True
+            return
+        # scipy импортируется лениво: моделям без расстояний он не нужен
+        from scipy.sparse.csgraph import shortest_path
         adj = self.adj_matrix()
         dist_sp = shortest_path(adj, method='auto', directed=False)
         self.dist_matrix = dist_sp
+        self._dist_valid = True
         #return dist_sp
     def individual_shortest(self, agent_id, adj = None):
         """находит кратчайшие пути для конкретного агента, возвращает вектор?"""
         if adj is None:
             adj = self.adj_matrix()
+        if self.distance_engine == 'integer':
+            weights = integer_weights(adj)
+            # Неориентированный граф: у несимметричной матрицы берётся меньший из двух весов
+            weights = np.where(weights == 0, weights.T, np.where(weights.T == 0, weights, np.minimum(weights, weights.T)))
+            return to_float(dial_sssp(weights, agent_id))
+        from scipy.sparse.csgraph import shortest_path
         dist_sp = shortest_path(adj, method='auto', directed=False, indices=agent_id)
         #print(dist_sp)
         return dist_sp
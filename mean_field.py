@@ -0,0 +1,160 @@
+import hashlib
+
+import numpy as np
+
+from population import idea_values
+
+
+class TypeEngine:
+    """
+    Динамика лучших ответов на типах агентов для моделей mil1 и mil10
+
+    В этих моделях полезность агента зависит только от его hedges и степеней идей,
+    поэтому агенты с одинаковыми hedges взаимозаменяемы. Популяция хранится как
+    набор различных векторов (типов) с кратностями, а ход переводит одного агента
+    из типа в тип, так что стоимость раунда пропорциональна числу типов, а не N.
+    """
+
+    def __init__(self, hedges: np.ndarray, model='mil1', c=0.2, alpha=2):
+        """
+        Args:
+            hedges: матрица hedges (N, M), строка i - агент с id i
+            model: mil1 или mil10
+            c: коэффициент модели
+            alpha: степень функции
+        """
+        if model not in ('mil1', 'mil10'):
+            raise ValueError(f"TypeEngine работает только с mil1 и mil10, получено {model}")
+        hedges = np.asarray(hedges, dtype=np.uint8)
+        self.N, self.M = hedges.shape
+        self.model = model
+        self.c = c
+        self.alpha = alpha
+        unique, inverse = np.unique(hedges, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        self.types: list[np.ndarray] = [row.copy() for row in unique]
+        self._index = {row.tobytes(): t for t, row in enumerate(self.types)}
+        self.members: list[list[int]] = [[] for _ in self.types]
+        for agent_id, t in enumerate(inverse):
+            self.members[t].append(agent_id)
+        self.degrees = hedges.sum(axis=0).astype(np.int64)
+        self.rounds = 0
+        self.moves = 0
+        self.outcome = None
+
+    def counts(self) -> np.ndarray:
+        """Кратности типов"""
+        return np.array([len(members) for members in self.members])
+
+    def n_types(self) -> int:
+        """Количество непустых типов"""
+        return sum(1 for members in self.members if members)
+
+    def type_utilities(self) -> np.ndarray:
+        """Полезность агента каждого типа при текущих степенях"""
+        values = idea_values(self.degrees, self.model, self.c, self.alpha)
+        return np.array([values[row == 1].sum() for row in self.types])
+
+    def best_move(self, t: int) -> tuple[list[int], float] | None:
+        """
+        Лучший ход агента типа t с тем же порядком разрешения ничьих, что у Agent.find_best_move:
+        сначала одиночные смены (меньший индекс), затем обмены 1-на-1, только если строго лучше
+
+        Returns:
+            (изменённые позиции, прирост) или None
+        """
+        row = self.types[t]
+        held = row == 1
+        drop = -idea_values(self.degrees, self.model, self.c, self.alpha)
+        add = idea_values(self.degrees + 1, self.model, self.c, self.alpha)
+        gains = np.where(held, drop, add)
+        best_move = None
+        best_improvement = 0
+        i = int(np.argmax(gains))
+        if gains[i] > best_improvement:
+            best_improvement = gains[i]
+            best_move = ([i], float(gains[i]))
+        if held.any() and not held.all():
+            drop_masked = np.where(held, drop, -np.inf)
+            add_masked = np.where(held, -np.inf, add)
+            i = int(np.argmax(drop_masked))
+            j = int(np.argmax(add_masked))
+            improvement = drop_masked[i] + add_masked[j]
+            if improvement > best_improvement:
+                best_move = ([i, j], float(improvement))
+        return best_move
+
+    def _move(self, t: int, positions: list[int]) -> int:
+        """Переводит одного агента типа t в тип с инвертированными positions"""
+        agent_id = self.members[t].pop()
+        row = self.types[t].copy()
+        for i in positions:
+            self.degrees[i] += 1 - 2 * int(row[i])
+            row[i] = 1 - row[i]
+        key = row.tobytes()
+        target = self._index.get(key)
+        if target is None:
+            target = len(self.types)
+            self.types.append(row)
+            self.members.append([])
+            self._index[key] = target
+        self.members[target].append(agent_id)
+        self.moves += 1
+        return target
+
+    def run(self, max_rounds=None, callback=None) -> str:
+        """
+        Асинхронная динамика: в каждом раунде типы обходятся по порядку, и агенты
+        типа по одному делают лучший ход, пока он улучшает полезность
+
+        Порядок обхода отличается от Game.evolve_anim: там каждый агент ходит один раз
+        за раунд в порядке Game.agents, здесь агенты идут группами по типам в порядке
+        их появления, а ушедший агент может сходить ещё раз, попав в тип с большим
+        индексом. Поэтому траектория и итоговое равновесие могут отличаться от evolve_anim.
+
+        Args:
+            max_rounds: предел числа раундов (по умолчанию 500 * N, как в Game)
+            callback: функция (раунд, равновесие), вызываемая после каждого раунда
+        Returns:
+            'equilibrium', 'cycle' (повтор кратностей типов в начале раунда) или 'limit'
+        """
+        if max_rounds is None:
+            max_rounds = 500 * self.N
+        flag = False
+        seen = set()
+        cycle_flag = False
+        while not flag and self.rounds < max_rounds and not cycle_flag:
+            self.rounds += 1
+            # Раунд зависит только от списка типов и их кратностей (типы лишь добавляются),
+            # поэтому повтор кратностей в начале раунда означает цикл
+            state = hashlib.blake2b(self.counts().tobytes(), digest_size=16).digest()
+            cycle_flag = state in seen
+            seen.add(state)
+            flag = True
+            for t in range(len(self.types)):
+                while self.members[t]:
+                    move = self.best_move(t)
+                    if move is None:
+                        break
+                    self._move(t, move[0])
+                    flag = False
+            if callback is not None:
+                callback(self.rounds, flag)
+        self.outcome = 'equilibrium' if flag else 'cycle' if cycle_flag else 'limit'
+        return self.outcome
+
+    def expand(self) -> np.ndarray:
+        """Матрица hedges (N, M) с агентами на своих местах"""
+        hedges = np.zeros((self.N, self.M), dtype=np.uint8)
+        for row, members in zip(self.types, self.members):
+            if members:
+                hedges[members] = row
+        return hedges
+
+    def agent_utilities(self) -> np.ndarray:
+        """Полезности агентов по возрастанию id"""
+        utilities = np.zeros(self.N)
+        for utility, members in zip(self.type_utilities(), self.members):
+            if members:
+                utilities[members] = utility
+        return utilities
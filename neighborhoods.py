@@ -0,0 +1,311 @@
+import itertools
+
+import numpy as np
+
+
+NEIGHBORHOODS = ('flip', 'swap', 'add_two', 'drop_two', 'k_flip', 'k_swap')
+
+
+class IncrementalScorer:
+    """
+    Полезность агента при пробных изменениях его hedges без пересчёта utility()
+
+    Для mil1, mil10 и mil00 слагаемое идеи зависит только от её степени, а число
+    соседей mil00 - от строки совместного участия, поэтому изменение одной
+    принадлежности пересчитывается за O(1) (mil00 - за O(степень идеи)).
+    Система при этом не меняется. Для mil01 (расстояния) изменения применяются
+    к системе и оцениваются через Agent.utility.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.model = agent.model
+        self.incremental = self.model in ('mil1', 'mil10', 'mil00')
+        system = agent._system
+        self.system = system
+        self.held = np.array(agent.hedges, dtype=bool)
+        if not self.incremental:
+            self.value = agent.utility()
+            return
+        i = agent.identifier
+        self.degrees = [system.ideas[j].get_deg() for j in range(agent.M)]
+        self._members = {}
+        self.value = float(sum(self._term(self.degrees[j]) for j in np.flatnonzero(self.held)))
+        if self.model == 'mil00':
+            if system.C is not None:
+                self.shared = system.C[i].astype(np.int64)
+            else:
+                self.shared = np.zeros(system.N, dtype=np.int64)
+                for j in np.flatnonzero(self.held):
+                    self.shared[self._others(j)] += 1
+                self.shared[i] = int(self.held.sum())
+            self.value += int(np.count_nonzero(self.shared))
+
+    def _term(self, degree: int) -> float:
+        if self.model == 'mil1':
+            return degree
+        if self.model == 'mil10':
+            return degree - self.agent.c * degree ** self.agent.alpha - 0.5
+        return -self.agent.c * degree ** self.agent.alpha
+
+    def _others(self, j: int) -> np.ndarray:
+        """Другие агенты идеи j (состав идей в ходе поиска меняется только для самого агента)"""
+        if j not in self._members:
+            i = self.agent.identifier
+            if self.system.B is not None:
+                members = np.flatnonzero(self.system.B[:, j])
+            else:
+                members = np.array([agent.identifier for agent in self.system.ideas[j].agents], dtype=np.int64)
+            self._members[j] = members[members != i]
+        return self._members[j]
+
+    def flip(self, j: int):
+        """Инвертирует принадлежность агента к идее j и обновляет value"""
+        added = not self.held[j]
+        self.held[j] = added
+        j = int(j)
+        if not self.incremental:
+            self.agent.hedges[j] = int(added)
+            self.system.ideas[j].invert(self.agent)
+            self.value = self.agent.utility()
+            return
+        if added:
+            self.degrees[j] += 1
+            self.value += self._term(self.degrees[j])
+        else:
+            self.value -= self._term(self.degrees[j])
+            self.degrees[j] -= 1
+        if self.model == 'mil00':
+            i = self.agent.identifier
+            others = self._others(j)
+            if added:
+                self.value += int(np.count_nonzero(self.shared[others] == 0))
+                self.shared[others] += 1
+                self.shared[i] += 1
+                self.value += int(self.shared[i] == 1)
+            else:
+                self.shared[others] -= 1
+                self.value -= int(np.count_nonzero(self.shared[others] == 0))
+                self.shared[i] -= 1
+                self.value -= int(self.shared[i] == 0)
+
+
+class NeighborhoodSearch:
+    """
+    Лучший ход агента в заданных окрестностях
+
+    Окрестности (в порядке перебора, при равенстве прироста выигрывает более ранний ход):
+        'flip'     - изменение одной принадлежности (как в find_best_move)
+        'swap'     - одна идея убрана, одна добавлена (как в find_best_move)
+        'add_two'  - добавлены две идеи
+        'drop_two' - убраны две идеи
+        'k_flip'   - изменены любые k принадлежностей
+        'k_swap'   - k идей убраны, k добавлены
+    Ходы перебираются в лексикографическом порядке, и каждый оценивается от предыдущего:
+    отменяются и применяются только позиции за пределами общего префикса.
+    """
+
+    def __init__(self, neighborhoods=('flip', 'swap'), k=2, budget=None, tol=1e-9):
+        """
+        Args:
+            neighborhoods: имена окрестностей из NEIGHBORHOODS
+            k: размер хода для 'k_flip' и 'k_swap'
+            budget: наибольшее число пробных изменений принадлежности на один поиск
+                (None - без ограничения); при исчерпании возвращается лучший найденный ход
+            tol: минимальный прирост, считающийся улучшением (погрешность инкрементальных сумм)
+        """
+        for name in neighborhoods:
+            if name not in NEIGHBORHOODS:
+                raise ValueError(f"Неизвестная окрестность: {name}")
+        self.neighborhoods = tuple(neighborhoods)
+        self.k = k
+        self.budget = budget
+        self.tol = tol
+
+    def config(self) -> dict:
+        """Параметры, определяющие выбор ходов (для ключа кэша результатов)"""
+        return {'search': 'neighborhood', 'neighborhoods': list(self.neighborhoods), 'k': self.k,
+                'budget': self.budget, 'tol': self.tol}
+
+    def candidates(self, hedges: list[int]):
+        """Ходы всех окрестностей - кортежи позиций, первыми идут убираемые идеи"""
+        ones = [i for i, bit in enumerate(hedges) if bit == 1]
+        zeros = [i for i, bit in enumerate(hedges) if bit == 0]
+        for name in self.neighborhoods:
+            if name == 'flip':
+                yield from ((i,) for i in range(len(hedges)))
+            elif name == 'swap':
+                yield from ((i, j) for i in ones for j in zeros)
+            elif name == 'add_two':
+                yield from itertools.combinations(zeros, 2)
+            elif name == 'drop_two':
+                yield from itertools.combinations(ones, 2)
+            elif name == 'k_flip':
+                yield from itertools.combinations(range(len(hedges)), self.k)
+            elif name == 'k_swap':
+                for out in itertools.combinations(ones, self.k):
+                    yield from (out + inn for inn in itertools.combinations(zeros, self.k))
+
+    def round_finished(self, moved: bool) -> bool:
+        """Раунд без ходов означает равновесие в заданных окрестностях"""
+        return not moved
+
+    def best_move(self, agent) -> tuple[list[int], float] | None:
+        """
+        Находит лучший ход агента, не изменяя его состояние
+
+        Returns:
+            tuple: (список изменённых принадлежностей, прирост полезности) или None, как find_best_move
+        """
+        if agent._system is None:
+            raise ValueError("Агент должен быть добавлен в GraphManager")
+        scorer = IncrementalScorer(agent)
+        current = scorer.value
+        best_move = None
+        best_improvement = 0
+        applied = []
+        cost = 0
+        for move in self.candidates(agent.hedges):
+            common = 0
+            while common < min(len(applied), len(move)) and applied[common] == move[common]:
+                common += 1
+            steps = len(applied) - common + len(move) - common
+            if self.budget is not None and cost + steps > self.budget:
+                break
+            cost += steps
+            for position in reversed(applied[common:]):
+                scorer.flip(position)
+            for position in move[common:]:
+                scorer.flip(position)
+            applied = list(move)
+            improvement = float(scorer.value - current)
+            if improvement > best_improvement + self.tol:
+                best_improvement = improvement
+                best_move = (list(move), improvement)
+        for position in reversed(applied):
+            scorer.flip(position)
+        if not scorer.incremental:
+            agent.utility()
+        return best_move
+
+
+class SampledSearch:
+    """
+    Стохастический лучший ответ: лучший улучшающий ход среди случайной выборки
+    одиночных изменений и обменов
+
+    Раунд, в котором ни одна выборка не нашла улучшения, повторяется полным перебором
+    (NeighborhoodSearch): динамика останавливается, только если равновесие подтверждено.
+    """
+
+    def __init__(self, samples=32, weighting='uniform', certify=True, seed=None, tol=1e-9):
+        """
+        Args:
+            samples: число случайных ходов на один поиск
+            weighting: 'uniform' - равновероятно среди всех ходов 'flip' и 'swap',
+                'degree' - добавляемые идеи (в одиночных сменах и обменах) выбираются с весом
+                (степень + 1), убираемые - равновероятно, а доля добавлений среди смен та же
+            certify: подтверждать равновесие раундом полного перебора
+            seed: зерно генератора выборки
+            tol: минимальный прирост, считающийся улучшением
+        """
+        if weighting not in ('uniform', 'degree'):
+            raise ValueError(f"Неизвестный способ выборки: {weighting}")
+        self.samples = samples
+        self.weighting = weighting
+        self.certify = certify
+        self.tol = tol
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.exhaustive = NeighborhoodSearch(tol=tol)
+        self.certifying = False
+        self._drawn = False
+
+    def config(self) -> dict | None:
+        """
+        Параметры, определяющие выбор ходов (для ключа кэша результатов)
+
+        Returns:
+            None, если запуск не воспроизводим: нет целого зерна или генератор уже использовался
+        """
+        if not isinstance(self.seed, (int, np.integer)) or self._drawn:
+            return None
+        return {'search': 'sampled', 'samples': self.samples, 'weighting': self.weighting,
+                'certify': self.certify, 'tol': self.tol, 'seed': int(self.seed)}
+
+    def _sample(self, hedges: list[int], degrees: np.ndarray) -> list[tuple]:
+        """Различные случайные ходы в порядке перебора NeighborhoodSearch"""
+        M = len(hedges)
+        held = np.array(hedges) == 1
+        ones = np.flatnonzero(held)
+        zeros = np.flatnonzero(~held)
+        n_flips = M
+        n_swaps = len(ones) * len(zeros)
+        weights = degrees + 1.0 if self.weighting == 'degree' else np.ones(M)
+        add_p = weights[zeros] / weights[zeros].sum() if len(zeros) else None
+        # Смена убирает держимую идею или добавляет новую: веса только у добавлений
+        flip_p = np.full(M, 1.0 / M)
+        if len(zeros):
+            flip_p[zeros] = add_p * len(zeros) / M
+        moves = set()
+        self._drawn = True
+        for _ in range(self.samples):
+            if self.rng.random() * (n_flips + n_swaps) < n_flips:
+                moves.add((int(self.rng.choice(M, p=flip_p)),))
+            else:
+                inn = self.rng.choice(zeros, p=add_p)
+                moves.add((int(self.rng.choice(ones)), int(inn)))
+        return sorted(moves, key=lambda move: (len(move), move))
+
+    def best_move(self, agent) -> tuple[list[int], float] | None:
+        """
+        Находит улучшающий ход агента, не изменяя его состояние
+
+        Returns:
+            tuple: (список изменённых принадлежностей, прирост полезности) или None, как find_best_move
+        """
+        if agent._system is None:
+            raise ValueError("Агент должен быть добавлен в GraphManager")
+        if self.certifying:
+            return self.exhaustive.best_move(agent)
+        scorer = IncrementalScorer(agent)
+        current = scorer.value
+        degrees = np.array([agent._system.ideas[j].get_deg() for j in range(agent.M)])
+        best_move = None
+        best_improvement = 0
+        for move in self._sample(agent.hedges, degrees):
+            for position in move:
+                scorer.flip(position)
+            improvement = float(scorer.value - current)
+            if improvement > best_improvement + self.tol:
+                best_improvement = improvement
+                best_move = (list(move), improvement)
+            for position in reversed(move):
+                scorer.flip(position)
+        if not scorer.incremental:
+            agent.utility()
+        return best_move
+
+    def round_finished(self, moved: bool) -> bool:
+        """
+        Сообщает об окончании раунда динамики
+
+        Args:
+            moved: делал ли ход хотя бы один агент
+        Returns:
+            bool: True, если динамику можно остановить (равновесие подтверждено)
+        """
+        if moved:
+            self.certifying = False
+            return False
+        if self.certifying or not self.certify:
+            return True
+        self.certifying = True
+        return False
+
+
+def make_search(options: dict):
+    """Поиск хода по словарю аргументов: с ключом 'samples' - SampledSearch, иначе NeighborhoodSearch"""
+    if 'samples' in options:
+        return SampledSearch(**options)
+    return NeighborhoodSearch(**options)
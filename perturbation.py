@@ -0,0 +1,117 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from ensemble import DEFAULT_COEFS, seed_stream
+from game import Game
+from manager import GraphManager
+from population import population_utilities
+
+
+# Общие для всех возмущений данные воркера: равновесие, его структуры и параметры игры
+_shared = {}
+
+
+def _init_worker(base: np.ndarray, precomputed: dict, config: dict):
+    _shared['base'] = base
+    _shared['precomputed'] = precomputed
+    _shared['config'] = config
+
+
+def random_flips(N: int, M: int, k: int, rng: np.random.Generator) -> list[tuple[int, int]]:
+    """k различных случайных пар (агент, идея)"""
+    cells = rng.choice(N * M, size=min(k, N * M), replace=False)
+    return [(int(cell) // M, int(cell) % M) for cell in cells]
+
+
+def _run_shock(task: tuple) -> dict:
+    seed, k = task
+    base = _shared['base']
+    config = _shared['config']
+    N, M = base.shape
+    flips = random_flips(N, M, k, np.random.default_rng(seed))
+    precomputed = GraphManager.perturb(_shared['precomputed'], flips, with_dist=config['model'] == 'mil01')
+    game = Game(N, M, model=config['model'], alpha=config['alpha'], c=config['c'], seed=seed, verbose=False,
+                hedges=precomputed['B'], precomputed=precomputed, system_options=config['system_options'],
+                search=config['search'])
+    game.run(config['dynamics'])
+    final = game.hedges_matrix()
+    welfare = game.summary()['welfare']
+    return {
+        'seed': seed,
+        'k': k,
+        'flips': flips,
+        'rounds': game.rounds,
+        'outcome': game.outcome,
+        'returned': bool(np.array_equal(final, base)),
+        'distance': int(np.count_nonzero(final != base)),
+        'welfare': welfare,
+        'welfare_change': welfare - config['welfare'],
+    }
+
+
+def perturbation_experiment(hedges: np.ndarray, model='mil1', c=None, alpha=2, k=1, shocks=100, dynamics='by_one',
+                            seed=0, workers=1, system_options=None, search=None) -> list[dict]:
+    """
+    Устойчивость достигнутого равновесия: k случайных изменений принадлежности,
+    повторный запуск динамики и сравнение нового исхода с исходным
+
+    Структуры равновесия (B, степени, веса, C при comembership и для mil01 расстояния) считаются
+    один раз; состояние после возмущения получается из их копий обновлениями
+    ранга один (GraphManager.perturb).
+
+    Args:
+        hedges: матрица hedges равновесия (N, M), например Game.hedges_matrix() после run
+        model, alpha: модель и степень функции
+        c: словарь коэффициентов (по умолчанию DEFAULT_COEFS)
+        k: число изменений в одном возмущении или список таких чисел
+        shocks: число возмущений для каждого k
+        dynamics: динамика Game.run для восстановления
+        seed: базовое зерно возмущений
+        workers: число процессов (1 - в текущем процессе)
+        system_options, search: аргументы Game
+    Returns:
+        Записи по возмущениям: зерно, k, изменения, раунды до остановки, исход,
+        вернулась ли система в то же равновесие, расстояние Хэмминга до него и благосостояние
+    """
+    base = np.array(hedges, dtype=np.uint8)
+    c = DEFAULT_COEFS if c is None else c
+    comembership = bool((system_options or {}).get('comembership', False))
+    precomputed = GraphManager.precompute(base, with_dist=model == 'mil01', comembership=comembership)
+    welfare = float(population_utilities(base, model, c[model], alpha, dist=precomputed.get('dist')).sum())
+    config = {'model': model, 'c': c, 'alpha': alpha, 'dynamics': dynamics, 'welfare': welfare,
+              'system_options': system_options, 'search': search}
+    ks = [k] if np.isscalar(k) else list(k)
+    tasks = [(shock_seed, size) for size in ks for shock_seed in seed_stream([seed, size], shocks)]
+    if workers == 1:
+        _init_worker(base, precomputed, config)
+        return [_run_shock(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(base, precomputed, config)) as pool:
+        return list(pool.map(_run_shock, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+
+def recovery_summary(results: list[dict]) -> list[dict]:
+    """
+    Статистика восстановления по каждому размеру возмущения k
+
+    Returns:
+        Строки: k, число возмущений, доля возвратов в то же равновесие, доля сошедшихся
+        запусков, среднее и медиана раундов до сходимости, среднее расстояние до
+        исходного равновесия и среднее изменение благосостояния
+    """
+    rows = []
+    for k in sorted({result['k'] for result in results}):
+        group = [result for result in results if result['k'] == k]
+        converged = [result for result in group if result['outcome'] == 'equilibrium']
+        rounds = np.array([result['rounds'] for result in converged], dtype=float)
+        rows.append({
+            'k': k,
+            'shocks': len(group),
+            'return_rate': float(np.mean([result['returned'] for result in group])),
+            'converged_rate': len(converged) / len(group),
+            'mean_recovery_rounds': float(rounds.mean()) if len(rounds) else None,
+            'median_recovery_rounds': float(np.median(rounds)) if len(rounds) else None,
+            'mean_distance': float(np.mean([result['distance'] for result in group])),
+            'mean_welfare_change': float(np.mean([result['welfare_change'] for result in group])),
+        })
+    return rows
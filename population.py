@@ -0,0 +1,122 @@
+import numpy as np
+
+from distances import to_float
+
+
+def hedges_matrix(agents) -> np.ndarray:
+    """
+    Матрица инцидентности агентов и идей
+
+    Args:
+        agents: итерируемое множество агентов с id 0..N-1
+    Returns:
+        Матрица uint8 размера (N, M), строка i - hedges агента с id i
+    """
+    agents = sorted(agents, key=lambda agent: agent.identifier)
+    return np.array([agent.hedges for agent in agents], dtype=np.uint8)
+
+
+def sequential_sums(values: np.ndarray) -> np.ndarray:
+    """
+    Суммы строк слева направо, как цикл total += x в Agent.utility
+
+    np.sum суммирует попарно и может отличаться от цикла в последнем бите, а
+    равенство полезностей решает, есть ли строгий прирост. Нули (непринятые идеи,
+    недостижимые агенты) не меняют накопленную сумму.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.shape[1] == 0:
+        return np.zeros(len(values))
+    return np.cumsum(values, axis=1)[:, -1]
+
+
+def subtract_per_idea(values: np.ndarray, counts: np.ndarray, c: float) -> np.ndarray:
+    """Вычитает c по одному разу за каждую принятую идею, как цикл total -= c в Agent.utility"""
+    values = np.asarray(values, dtype=float)
+    counts = np.asarray(counts)
+    for step in range(int(counts.max(initial=0))):
+        values = np.where(counts > step, values - c, values)
+    return values
+
+
+def idea_values(degrees: np.ndarray, model: str, c: float, alpha) -> np.ndarray:
+    """
+    Вклад идеи степени d в полезность её агента для моделей, зависящих только от степеней
+
+    Args:
+        degrees: степени идей
+        model: mil1 или mil10
+        c: коэффициент модели
+        alpha: степень функции
+    Returns:
+        Массив f(d): d для mil1, d - c * d ** alpha - 0.5 для mil10
+    """
+    degrees = np.asarray(degrees, dtype=float)
+    if model == 'mil1':
+        return degrees
+    elif model == 'mil10':
+        return degrees - c * degrees ** alpha - 0.5
+    raise ValueError(f"Модель {model} зависит не только от степеней идей")
+
+
+def neighbour_counts(hedges: np.ndarray, chunk_size=1024) -> np.ndarray:
+    """
+    Число агентов, делящих с агентом хотя бы одну идею (включая его самого, если у него есть идеи)
+
+    Строки матрицы совместного участия B·Bᵀ считаются блоками, чтобы не держать её целиком.
+    """
+    B = np.asarray(hedges, dtype=np.float32)
+    counts = np.empty(len(B), dtype=np.int64)
+    for start in range(0, len(B), chunk_size):
+        counts[start:start + chunk_size] = np.count_nonzero(B[start:start + chunk_size] @ B.T, axis=1)
+    return counts
+
+
+def harmonic_sums(dist: np.ndarray, chunk_size=1024) -> np.ndarray:
+    """
+    Суммы 1/d(i, j) по j != i; недостижимые агенты (inf или целочисленная
+    метка из distances.unreachable) дают 0. Целые матрицы переводятся во float блоками строк.
+    """
+    dist = np.asarray(dist)
+    sums = np.empty(len(dist))
+    for start in range(0, len(dist), chunk_size):
+        block = to_float(dist[start:start + chunk_size])
+        with np.errstate(divide='ignore'):
+            inverse = 1 / block
+        inverse[np.arange(len(block)), np.arange(start, start + len(block))] = 0
+        sums[start:start + chunk_size] = sequential_sums(inverse)
+    return sums
+
+
+def population_utilities(hedges: np.ndarray, model: str, c: float, alpha, dist: np.ndarray = None, neighbours: np.ndarray = None) -> np.ndarray:
+    """
+    Полезности всех агентов разом, те же формулы, что в Agent.utility
+
+    Слагаемые накапливаются в том же порядке, что в Agent.utility, поэтому
+    результат совпадает с ним до бита.
+
+    Args:
+        hedges: матрица hedges (N, M), строка i - агент с id i
+        model: mil1, mil10, mil00 или mil01
+        c: коэффициент модели
+        alpha: степень функции
+        dist: матрица кратчайших расстояний (нужна для mil01)
+        neighbours: готовые числа соседей для mil00 (иначе считаются по hedges)
+    Returns:
+        Вектор полезностей длины N
+    """
+    B = np.asarray(hedges)
+    degrees = B.sum(axis=0, dtype=np.int64)
+    if model == 'mil1':
+        return B.astype(np.int64) @ degrees
+    elif model == 'mil10':
+        return sequential_sums(B * idea_values(degrees, model, c, alpha))
+    elif model == 'mil00':
+        if neighbours is None:
+            neighbours = neighbour_counts(B)
+        return neighbours - sequential_sums(B * (c * degrees.astype(float) ** alpha))
+    elif model == 'mil01':
+        if dist is None:
+            raise ValueError("Для mil01 нужна матрица расстояний")
+        return subtract_per_idea(harmonic_sums(dist), B.sum(axis=1), c)
+    return np.zeros(len(B))
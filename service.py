@@ -0,0 +1,233 @@
+"""
+Локальный сервис симуляций на asyncio без внешних зависимостей
+
+    POST /jobs              - поставить запуск (JSON с полями ensemble.make_spec), ответ {"id": ...}
+    GET  /jobs              - список задач
+    GET  /jobs/<id>         - статус и сводка
+    GET  /jobs/<id>/events  - поток событий (NDJSON): раунды, затем итог
+
+Одинаковые описания запусков получают один и тот же id: повторный запрос
+присоединяется к уже идущей или завершённой задаче.
+"""
+import asyncio
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from ensemble import make_spec
+from game import Game
+from sweep import spec_key
+
+
+def run_job(job_id: str, spec: dict, events, cache=None) -> dict:
+    """Выполняет запуск в процессе пула, отправляя события раундов в очередь events"""
+    game = Game(spec['N'], spec['M'], model=spec['model'], alpha=spec['alpha'], c=spec['c'],
+                method=spec['method'], dens=spec['dens'], seed=spec['seed'], verbose=False, cache=cache,
+                progress=lambda event: events.put((job_id, event)))
+    try:
+        summary = dict(game.solve(spec['dynamics']))
+    finally:
+        # Метка конца потока событий: после неё все раунды задачи уже в очереди
+        events.put((job_id, None))
+    summary.update(spec)
+    return summary
+
+
+class Job:
+    """Задача сервиса: описание, статус, накопленные события и сводка"""
+
+    def __init__(self, job_id: str, spec: dict):
+        self.id = job_id
+        self.spec = spec
+        self.status = 'queued'
+        self.events: list[dict] = []
+        self.result = None
+        self.error = None
+        self.changed = asyncio.Condition()
+        self.drained = asyncio.Event()
+
+    def as_dict(self) -> dict:
+        return {'id': self.id, 'status': self.status, 'spec': self.spec, 'rounds_reported': len(self.events),
+                'result': self.result, 'error': self.error}
+
+    async def publish(self, event: dict = None):
+        async with self.changed:
+            if event is not None:
+                self.events.append(event)
+            self.changed.notify_all()
+
+
+class SimulationService:
+    """Очередь запусков с ограниченным пулом процессов и HTTP-интерфейсом на локальном сокете"""
+
+    def __init__(self, workers=2, host='127.0.0.1', port=8765, cache=None):
+        """
+        Args:
+            workers: число одновременно выполняемых запусков
+            host, port: адрес HTTP-интерфейса
+            cache: каталог ResultCache для воркеров (None - без кэша)
+        """
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.cache = cache
+        self.jobs: dict[str, Job] = {}
+        self._slots = None
+        self._pool = None
+        self._manager = None
+        self._events = None
+        self._loop = None
+
+    # --- задачи --------------------------------------------------------------
+
+    async def start(self):
+        """Поднимает пул процессов и поток, пересылающий события воркеров в цикл asyncio"""
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._manager = multiprocessing.Manager()
+        self._events = self._manager.Queue()
+        threading.Thread(target=self._relay_events, daemon=True).start()
+
+    async def stop(self):
+        self._events.put(None)
+        self._pool.shutdown(cancel_futures=True)
+        self._manager.shutdown()
+
+    def _relay_events(self):
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            job_id, event = item
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            if event is None:
+                self._loop.call_soon_threadsafe(job.drained.set)
+            else:
+                asyncio.run_coroutine_threadsafe(job.publish(event), self._loop)
+
+    def submit(self, spec: dict) -> Job:
+        """
+        Ставит запуск в очередь или возвращает уже существующую задачу с тем же описанием
+
+        Args:
+            spec: поля ensemble.make_spec (недостающие берутся по умолчанию)
+        """
+        spec = make_spec(**spec)
+        job_id = spec_key(spec)
+        job = self.jobs.get(job_id)
+        if job is not None and job.status != 'failed':
+            return job
+        job = Job(job_id, spec)
+        self.jobs[job_id] = job
+        asyncio.ensure_future(self._execute(job))
+        return job
+
+    async def _execute(self, job: Job):
+        async with self._slots:
+            job.status = 'running'
+            await job.publish()
+            try:
+                job.result = await self._loop.run_in_executor(
+                    self._pool, run_job, job.id, job.spec, self._events, self.cache)
+                # События пересылаются отдельным потоком: ждём, пока дойдут все раунды
+                await job.drained.wait()
+                job.status = 'done'
+            except Exception as error:
+                job.error = repr(error)
+                job.status = 'failed'
+            await job.publish()
+
+    async def stream(self, job: Job):
+        """Асинхронно выдаёт события задачи по мере появления, затем итоговую запись"""
+        sent = 0
+        while True:
+            async with job.changed:
+                while len(job.events) == sent and job.status in ('queued', 'running'):
+                    await job.changed.wait()
+                events = job.events[sent:]
+                finished = job.status in ('done', 'failed')
+            for event in events:
+                yield {'type': 'round', **event}
+            sent += len(events)
+            if finished and sent == len(job.events):
+                yield {'type': job.status, 'result': job.result, 'error': job.error}
+                return
+
+    # --- HTTP ----------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode().strip()
+            if not request_line:
+                return
+            method, path, _ = request_line.split(' ', 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            await self._route(method, path.rstrip('/'), body, writer)
+        except (ValueError, TypeError, json.JSONDecodeError) as error:
+            await self._respond(writer, 400, {'error': str(error)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        parts = [part for part in path.split('/') if part]
+        if method == 'POST' and parts == ['jobs']:
+            job = self.submit(json.loads(body or b'{}'))
+            await self._respond(writer, 202, {'id': job.id, 'status': job.status})
+        elif method == 'GET' and parts == ['jobs']:
+            await self._respond(writer, 200, [job.as_dict() for job in self.jobs.values()])
+        elif method == 'GET' and len(parts) in (2, 3) and parts[0] == 'jobs' and parts[1] in self.jobs:
+            job = self.jobs[parts[1]]
+            if len(parts) == 2:
+                await self._respond(writer, 200, job.as_dict())
+            elif parts[2] == 'events':
+                await self._stream_response(writer, job)
+            else:
+                await self._respond(writer, 404, {'error': 'not found'})
+        else:
+            await self._respond(writer, 404, {'error': 'not found'})
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload):
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def _stream_response(self, writer: asyncio.StreamWriter, job: Job):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        async for event in self.stream(job):
+            line = json.dumps(event).encode() + b"\n"
+            writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def serve_forever(self):
+        """Запускает сервис и обслуживает запросы до отмены"""
+        await self.start()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def serve(workers=2, host='127.0.0.1', port=8765, cache=None):
+    """Блокирующий запуск сервиса"""
+    asyncio.run(SimulationService(workers=workers, host=host, port=port, cache=cache).serve_forever())
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class StatsTracker:
+    """
+    Агрегаты состояния, обновляемые на каждом Idea.invert и изменении полезности агента
+
+    Поддерживаются гистограмма степеней идей, суммарное и среднее благосостояние,
+    сумма квадратов полезностей (для дисперсии и коэффициента вариации) и суммы
+    полезностей агентов каждой идеи. Каждое событие стоит O(1): суммы по идеям ведутся
+    по «сведённым» полезностям, а изменившиеся агенты доводятся при чтении.
+    record() добавляет точку во временные ряды, так что траекторию хранить не нужно.
+    """
+
+    def __init__(self):
+        self.N = 0
+        self.M = 0
+        self.degrees = None
+        self.degree_hist = None
+        self.utilities = None
+        self.idea_sums = None
+        self.synced = None
+        self._pending = {}  # id -> агент, чья полезность ещё не сведена в idea_sums
+        self.welfare = 0.0
+        self.square_sum = 0.0
+        self._series = {'step': [], 'welfare': [], 'mean': [], 'variance': [], 'cv': [],
+                        'degree_hist': [], 'idea_mean_utility': []}
+
+    def attach(self, system):
+        """Подключается к GraphManager и считает начальные значения по его состоянию (ряды сохраняются)"""
+        system.stats = self
+        agents = sorted(system.agents, key=lambda agent: agent.identifier)
+        hedges = np.array([agent.hedges for agent in agents], dtype=np.int64).reshape(len(agents), len(system.ideas))
+        self.load(hedges, [float(agent.U) for agent in agents])
+
+    def load(self, hedges: np.ndarray, utilities):
+        """
+        Пересчитывает все агрегаты по состоянию целиком, например по состоянию движка
+        (SyncEngine, TypeEngine) после раунда, когда поштучных событий нет
+
+        Args:
+            hedges: матрица hedges (N, M), строка i - агент с id i
+            utilities: полезности агентов по возрастанию id
+        """
+        B = np.asarray(hedges)
+        self.N, self.M = B.shape
+        self.degrees = B.sum(axis=0, dtype=np.int64)
+        self.degree_hist = np.bincount(self.degrees, minlength=self.N + 1)
+        self.utilities = np.array(utilities, dtype=float)
+        self.synced = self.utilities.copy()
+        self.idea_sums = B.T.astype(float) @ self.synced
+        self._pending = {}
+        self.welfare = float(self.utilities.sum())
+        self.square_sum = float((self.utilities ** 2).sum())
+
+    def on_invert(self, agent, idea_id: int, added: bool):
+        """Агент добавлен в идею или убран из неё"""
+        old = self.degrees[idea_id]
+        new = old + 1 if added else old - 1
+        self.degree_hist[old] -= 1
+        self.degree_hist[new] += 1
+        self.degrees[idea_id] = new
+        utility = self.synced[agent.identifier]
+        self.idea_sums[idea_id] += utility if added else -utility
+
+    def on_utility(self, agent, new: float):
+        """Полезность агента стала равной new"""
+        i = agent.identifier
+        old = self.utilities[i]
+        delta = new - old
+        if delta == 0:
+            return
+        self.utilities[i] = new
+        self.welfare += delta
+        self.square_sum += new * new - old * old
+        self._pending[i] = agent
+
+    @property
+    def idea_utility(self) -> np.ndarray:
+        """Суммы полезностей агентов каждой идеи"""
+        for i, agent in self._pending.items():
+            delta = self.utilities[i] - self.synced[i]
+            if delta:
+                self.idea_sums[np.asarray(agent.hedges) == 1] += delta
+                self.synced[i] = self.utilities[i]
+        self._pending.clear()
+        return self.idea_sums
+
+    def mean(self) -> float:
+        return self.welfare / self.N if self.N else 0.0
+
+    def variance(self) -> float:
+        if not self.N:
+            return 0.0
+        return max(self.square_sum / self.N - self.mean() ** 2, 0.0)
+
+    def idea_mean_utility(self) -> np.ndarray:
+        """Средняя полезность агентов каждой идеи (0 для пустых), как Idea.get_average_utility"""
+        return np.divide(self.idea_utility, self.degrees, out=np.zeros(self.M), where=self.degrees > 0)
+
+    def record(self, step: int):
+        """Добавляет текущие агрегаты во временные ряды"""
+        mean = self.mean()
+        variance = self.variance()
+        self._series['step'].append(step)
+        self._series['welfare'].append(self.welfare)
+        self._series['mean'].append(mean)
+        self._series['variance'].append(variance)
+        self._series['cv'].append(np.sqrt(variance) / abs(mean) if mean else 0.0)
+        self._series['degree_hist'].append(self.degree_hist.copy())
+        self._series['idea_mean_utility'].append(self.idea_mean_utility())
+
+    def series(self) -> dict[str, np.ndarray]:
+        """Временные ряды: скаляры - векторы, гистограммы и средние по идеям - матрицы (шаг x ...)"""
+        return {name: np.array(values) for name, values in self._series.items()}
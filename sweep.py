@@ -0,0 +1,212 @@
+import numpy as np
+import hashlib
+import itertools
+import json
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from ensemble import make_spec, run_spec, seed_stream
+
+
+# Поля описания запуска (см. ensemble.make_spec), из которых строится ключ
+SPEC_FIELDS = ['N', 'M', 'model', 'alpha', 'c', 'method', 'dens', 'dynamics', 'seed']
+# Скалярные колонки хранилища; остальные поля сводки сохраняются как JSON-строки
+SCALAR_COLUMNS = ['key', 'N', 'M', 'model', 'alpha', 'method', 'dens', 'dynamics', 'seed',
+                  'rounds', 'outcome', 'welfare']
+JSON_COLUMNS = ['c', 'utilities', 'degree_distribution']
+
+
+def spec_key(spec: dict) -> str:
+    """Устойчивый ключ конфигурации запуска (хэш отсортированного JSON)"""
+    payload = json.dumps(spec, sort_keys=True, default=float)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def grid_design(space: dict, replicas=1, seed=0) -> list[dict]:
+    """
+    Полный перебор параметров Game
+
+    Args:
+        space: словарь {параметр make_spec: список значений}, например
+            {'N': [20, 40], 'model': ['mil1', 'mil00'], 'c': [{...}, {...}]}
+        replicas: количество реплик (разных зерен) на каждую точку сетки
+        seed: базовое зерно для зерен реплик
+    Returns:
+        Список описаний запусков
+    """
+    names = list(space)
+    specs = []
+    for point, values in enumerate(itertools.product(*(space[name] for name in names))):
+        params = dict(zip(names, values))
+        for run_seed in seed_stream([seed, point], replicas):
+            specs.append(make_spec(**{'seed': run_seed, **params}))
+    return specs
+
+
+def random_design(space: dict, n_points: int, replicas=1, seed=0) -> list[dict]:
+    """
+    Случайный план по параметрам Game
+
+    Args:
+        space: словарь {параметр: список значений или пара (low, high)};
+            для пары int выбирается целое из [low, high], для float - равномерно
+        n_points: количество точек плана
+        replicas: количество реплик на точку
+        seed: зерно плана
+    Returns:
+        Список описаний запусков
+    """
+    rng = np.random.default_rng(seed)
+    specs = []
+    for point in range(n_points):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = int(rng.integers(low, high + 1))
+                else:
+                    params[name] = float(rng.uniform(low, high))
+            else:
+                params[name] = values[rng.integers(len(values))]
+        for run_seed in seed_stream([seed, point], replicas):
+            specs.append(make_spec(**{'seed': run_seed, **params}))
+    return specs
+
+
+class ResultStore:
+    """Колоночное хранилище сводок на диске: каталог с частями parts/part-*.npz"""
+
+    def __init__(self, root):
+        """
+        Args:
+            root: каталог хранилища (создаётся при необходимости)
+        """
+        self.root = root
+        self.parts_dir = os.path.join(root, 'parts')
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self._buffer = []
+
+    def _parts(self) -> list[str]:
+        return sorted(os.path.join(self.parts_dir, name)
+                      for name in os.listdir(self.parts_dir) if name.endswith('.npz'))
+
+    def _write_part(self, columns: dict, name: str):
+        # Пишем во временный файл и переименовываем, чтобы читатели никогда не видели недописанную часть
+        tmp_path = os.path.join(self.parts_dir, name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, os.path.join(self.parts_dir, name))
+
+    def append(self, summary: dict):
+        """Добавляет сводку в буфер (на диск попадает при flush)"""
+        row = dict(summary)
+        row.setdefault('key', spec_key({name: summary[name] for name in SPEC_FIELDS}))
+        self._buffer.append(row)
+
+    def flush(self):
+        """Атомарно записывает буфер отдельной частью"""
+        if not self._buffer:
+            return
+        columns = {}
+        for name in SCALAR_COLUMNS:
+            values = [row[name] for row in self._buffer]
+            if name in ('model', 'method', 'dynamics', 'key', 'outcome'):
+                columns[name] = np.array([str(value) for value in values])
+            elif name == 'seed':
+                columns[name] = np.array([-1 if value is None else value for value in values], dtype=np.int64)
+            else:
+                columns[name] = np.array(values)
+        for name in JSON_COLUMNS:
+            columns[name] = np.array([json.dumps(row[name]) for row in self._buffer])
+        name = f"part-{len(self._parts()):06d}-{uuid.uuid4().hex[:8]}"
+        self._write_part(columns, name + '.npz')
+        self._buffer = []
+
+    def completed_keys(self) -> set[str]:
+        """Ключи уже сохранённых запусков"""
+        keys = set()
+        for path in self._parts():
+            with np.load(path) as part:
+                keys.update(part['key'].tolist())
+        return keys
+
+    def load(self, decode_json=False) -> dict[str, np.ndarray]:
+        """
+        Читает все части
+
+        Args:
+            decode_json: раскодировать ли JSON-колонки в списки Python
+        Returns:
+            Словарь {колонка: массив}
+        """
+        parts = []
+        for path in self._parts():
+            with np.load(path) as part:
+                parts.append({name: part[name] for name in part.files})
+        if not parts:
+            return {}
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        if decode_json:
+            for name in JSON_COLUMNS:
+                columns[name] = [json.loads(value) for value in columns[name]]
+        return columns
+
+    def compact(self):
+        """Сливает все части в одну"""
+        paths = self._parts()
+        if len(paths) < 2:
+            return
+        columns = self.load()
+        self._write_part(columns, f"part-000000-{uuid.uuid4().hex[:8]}.npz")
+        for path in paths:
+            os.remove(path)
+
+
+def run_sweep(specs: list[dict], store: ResultStore, workers=None, flush_every=10, cache=None) -> int:
+    """
+    Выполняет план, пропуская уже сохранённые конфигурации
+
+    Результаты пишутся в store по мере готовности, так что после падения
+    повторный вызов с тем же планом досчитывает только недостающее.
+
+    Args:
+        specs: описания запусков
+        store: хранилище результатов
+        workers: число процессов (1 - в текущем процессе)
+        flush_every: сколько результатов накапливать перед записью части
+        cache: каталог ResultCache, общий для всех запусков (None - без кэша)
+    Returns:
+        Количество выполненных в этом вызове запусков
+    """
+    done = store.completed_keys()
+    pending = {}
+    for spec in specs:
+        key = spec_key(spec)
+        if key not in done:
+            pending[key] = spec
+    finished = 0
+    worker = partial(run_spec, cache=cache)
+
+    def collect(key, summary):
+        nonlocal finished
+        summary['key'] = key
+        store.append(summary)
+        finished += 1
+        if finished % flush_every == 0:
+            store.flush()
+
+    try:
+        if workers == 1:
+            for key, spec in pending.items():
+                collect(key, worker(spec))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(worker, spec): key for key, spec in pending.items()}
+                for future in as_completed(futures):
+                    collect(futures[future], future.result())
+    finally:
+        store.flush()
+    return finished
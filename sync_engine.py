@@ -0,0 +1,318 @@
+import numpy as np
+
+from population import idea_values, population_utilities, sequential_sums, subtract_per_idea
+
+
+NO_IDEA = -1
+
+
+class SyncEngine:
+    """
+    Синхронная динамика: все N агентов одновременно выбирают лучший ответ
+    (одиночная смена или обмен 1-на-1) на замороженное состояние, после чего
+    ходы применяются вместе, как в Game.evolve_sim, но для всех моделей.
+
+    Ход агента хранится как пара (drop, add): индекс отбрасываемой и
+    добавляемой идеи или NO_IDEA. Порядок разрешения ничьих тот же, что у
+    Agent.find_best_move: одиночные смены по возрастанию индекса, затем
+    обмены (i, j) в лексикографическом порядке, только если строго лучше.
+    Строго лучше значит больше, чем на tol: матричные суммы отличаются от
+    поагентных в последних битах, и такой «прирост» не считается ходом.
+    """
+
+    def __init__(self, hedges: np.ndarray, model='mil1', c=0.2, alpha=2, chunk_size=256, tol=1e-9):
+        """
+        Args:
+            hedges: матрица hedges (N, M), строка i - агент с id i
+            model: mil1, mil10, mil00 или mil01
+            c: коэффициент модели
+            alpha: степень функции
+            chunk_size: сколько агентов обрабатывать одним матричным блоком
+            tol: минимальный прирост, считающийся улучшением (как у NeighborhoodSearch)
+        """
+        self.B = np.array(hedges, dtype=np.uint8)
+        self.N, self.M = self.B.shape
+        self.model = model
+        self.c = c
+        self.alpha = alpha
+        self.chunk_size = chunk_size
+        self.tol = tol
+        self.rounds = 0
+        self.outcome = None
+        self.dist = None
+
+    # --- лучшие ответы -------------------------------------------------------
+
+    @staticmethod
+    def _best_swaps(swap_gains: np.ndarray):
+        """
+        Лучший обмен каждой строки по полной матрице приростов
+
+        Args:
+            swap_gains: (R, M, M) приросты обменов (drop, add), -inf вне held x ~held
+        Returns:
+            swap_idx (индекс drop * M + add, первый среди равных в лексикографическом порядке), swap_best
+        """
+        R, M, _ = swap_gains.shape
+        swap_flat = swap_gains.reshape(R, M * M)
+        swap_idx = np.argmax(swap_flat, axis=1)
+        return swap_idx, swap_flat[np.arange(R), swap_idx]
+
+    @staticmethod
+    def _choose(flip_gains: np.ndarray, held: np.ndarray, swap_idx: np.ndarray, swap_best: np.ndarray, tol=0.0):
+        """
+        Выбор хода по приростам одиночных смен и лучшим обменам строк
+
+        Args:
+            flip_gains: (R, M) приросты одиночных смен
+            held: (R, M) маска принятых идей
+            swap_idx: (R,) лучший обмен строки, индекс drop * M + add
+            swap_best: (R,) его прирост (-inf, если обменов нет)
+            tol: на сколько ход должен превзойти отсутствие хода и лучшую одиночную смену
+        Returns:
+            drop, add, improvement - массивы длины R
+        """
+        R, M = flip_gains.shape
+        rows = np.arange(R)
+        flip_idx = np.argmax(flip_gains, axis=1)
+        flip_best = flip_gains[rows, flip_idx]
+
+        drop = np.full(R, NO_IDEA)
+        add = np.full(R, NO_IDEA)
+        improvement = np.zeros(R)
+        use_flip = flip_best > tol
+        flip_held = held[rows, flip_idx]
+        drop[use_flip & flip_held] = flip_idx[use_flip & flip_held]
+        add[use_flip & ~flip_held] = flip_idx[use_flip & ~flip_held]
+        improvement[use_flip] = flip_best[use_flip]
+        use_swap = swap_best > np.where(use_flip, flip_best, 0) + tol
+        drop[use_swap] = swap_idx[use_swap] // M
+        add[use_swap] = swap_idx[use_swap] % M
+        improvement[use_swap] = swap_best[use_swap]
+        return drop, add, improvement
+
+    def _degree_responses(self, rows: np.ndarray):
+        """mil1/mil10: приросты складываются из значений f(d) по идеям"""
+        degrees = self.B.sum(axis=0, dtype=np.int64)
+        drop_gain = -idea_values(degrees, self.model, self.c, self.alpha)
+        add_gain = idea_values(degrees + 1, self.model, self.c, self.alpha)
+        held = self.B[rows] == 1
+        flip_gains = np.where(held, drop_gain, add_gain)
+        drop_part = np.where(held, drop_gain, -np.inf)
+        add_part = np.where(held, -np.inf, add_gain)
+        # Лучший обмен - лучший сброс плюс лучшее добавление; argmax по
+        # каждой оси даёт лексикографически первую пару среди равных
+        i = np.argmax(drop_part, axis=1)
+        j = np.argmax(add_part, axis=1)
+        r = np.arange(len(rows))
+        swap_best = drop_part[r, i] + add_part[r, j]
+        return self._choose(flip_gains, held, i * self.M + j, swap_best, self.tol)
+
+    def _mil00_responses(self, rows: np.ndarray):
+        """
+        mil00: изменение числа соседей читается из строк матрицы совместного участия C = B·Bᵀ.
+        Добавление идеи b приносит агентов с C = 0 из b, сброс идеи a теряет агентов
+        с C = 1 из a, а при обмене теряются лишь те из них, кто не состоит в b.
+        """
+        B = self.B.astype(np.float32)
+        degrees = self.B.sum(axis=0, dtype=np.int64).astype(float)
+        held = self.B[rows] == 1
+        R = len(rows)
+        r = np.arange(R)
+        co = B[rows] @ B.T
+        co[r, rows] = -1  # сам агент не считается в C
+        zero = (co == 0).astype(np.float32)
+        one = co == 1
+        gained = zero @ B
+        lost = one.astype(np.float32) @ B
+        own = held.sum(axis=1)
+        # Сам агент входит в своих соседей, пока у него есть хотя бы одна идея
+        gained += (own == 0)[:, None]
+        lost += (own == 1)[:, None]
+        add_gain = gained - self.c * (degrees + 1) ** self.alpha
+        drop_gain = -lost + self.c * degrees ** self.alpha
+        flip_gains = np.where(held, drop_gain, add_gain)
+
+        drop_part = np.where(held, drop_gain, -np.inf)
+        add_part = np.where(held, -np.inf, add_gain)
+        # Для обмена поправка самого агента не нужна: число его идей не меняется
+        drop_part += np.where(held, (own == 1)[:, None], 0)
+        # Матрица обменов M x M строится по одному агенту, чтобы не держать (R, M, M)
+        swap_idx = np.zeros(R, dtype=np.int64)
+        swap_best = np.full(R, -np.inf)
+        for k in range(R):
+            if not held[k].any() or held[k].all():
+                continue
+            swap_gains = drop_part[k][:, None] + add_part[k][None, :]
+            others = self.B[one[k]]
+            if len(others):
+                # Соседи через единственную общую идею a, которые состоят и в b, не теряются
+                swap_gains += (others * held[k]).T.astype(float) @ others
+            swap_idx[k], swap_best[k] = (array[0] for array in self._best_swaps(swap_gains[None]))
+        return self._choose(flip_gains, held, swap_idx, swap_best, self.tol)
+
+    def _mil01_responses(self, rows: np.ndarray):
+        """
+        mil01: для каждого агента все кандидаты оцениваются одним запуском Дейкстры
+        на графе, где агент удалён, а каждый кандидат представлен виртуальной
+        вершиной-источником с рёбрами его новой строки смежности
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import shortest_path
+
+        degrees = self.B.sum(axis=0, dtype=np.int64)
+        adj = self.adjacency()
+        current = population_utilities(self.B, 'mil01', self.c, self.alpha, dist=self.frozen_dist())
+        drops, adds, improvements = [], [], []
+        for agent in rows:
+            h = self.B[agent].astype(bool)
+            ones = np.flatnonzero(h)
+            zeros = np.flatnonzero(~h)
+            candidates = [(i, NO_IDEA) if h[i] else (NO_IDEA, i) for i in range(self.M)]
+            candidates += [(i, j) for i in ones for j in zeros]
+            P = np.repeat(h[None, :], len(candidates), axis=0)
+            for n, (i, j) in enumerate(candidates):
+                if i != NO_IDEA:
+                    P[n, i] = False
+                if j != NO_IDEA:
+                    P[n, j] = True
+            cand_degrees = degrees + (P.astype(np.int64) - h)
+            others = self.B.astype(bool).copy()
+            others[agent] = False
+            weights = np.where(P[:, None, :] & others[None, :, :], cand_degrees[:, None, :], np.inf).min(axis=2)
+
+            base = adj.copy()
+            base[agent, :] = np.inf
+            base[:, agent] = np.inf
+            bi, bj = np.nonzero(np.isfinite(base))
+            vi, vj = np.nonzero(np.isfinite(weights))
+            size = self.N + len(candidates)
+            graph = coo_matrix((np.concatenate([base[bi, bj], weights[vi, vj]]),
+                                (np.concatenate([bi, vi + self.N]), np.concatenate([bj, vj]))),
+                               shape=(size, size)).tocsr()
+            dist = shortest_path(graph, method='D', directed=True, indices=np.arange(self.N, size))[:, :self.N]
+            dist[:, agent] = np.inf
+            with np.errstate(divide='ignore'):
+                new_utility = subtract_per_idea(sequential_sums(1 / dist), P.sum(axis=1), self.c)
+            gains = new_utility - current[agent]
+
+            flip_gains = gains[None, :self.M]
+            swap_gains = np.full((1, self.M, self.M), -np.inf)
+            if len(ones) and len(zeros):
+                swap_gains[0][np.ix_(ones, zeros)] = gains[self.M:].reshape(len(ones), len(zeros))
+            drop, add, improvement = self._choose(flip_gains, h[None, :], *self._best_swaps(swap_gains), self.tol)
+            drops.append(drop[0])
+            adds.append(add[0])
+            improvements.append(improvement[0])
+        return np.array(drops, dtype=int), np.array(adds, dtype=int), np.array(improvements)
+
+    def best_responses(self, rows=None):
+        """
+        Лучшие ответы агентов rows на текущее (замороженное) состояние
+
+        Args:
+            rows: индексы агентов (None - все)
+        Returns:
+            drop, add, improvement - массивы по агентам rows
+        """
+        rows = np.arange(self.N) if rows is None else np.asarray(rows)
+        if self.model in ('mil1', 'mil10'):
+            kernel = self._degree_responses
+        elif self.model == 'mil00':
+            kernel = self._mil00_responses
+        elif self.model == 'mil01':
+            kernel = self._mil01_responses
+        else:
+            raise ValueError(f"Неизвестная модель: {self.model}")
+        parts = [kernel(rows[start:start + self.chunk_size]) for start in range(0, len(rows), self.chunk_size)]
+        if not parts:
+            return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    # --- состояние -----------------------------------------------------------
+
+    def adjacency(self) -> np.ndarray:
+        """Матрица смежности агентов: вес ребра - минимальная степень общей идеи, inf - нет ребра"""
+        degrees = self.B.sum(axis=0)
+        adj = np.full((self.N, self.N), np.inf)
+        for j in np.argsort(degrees, kind='stable')[::-1]:
+            members = np.flatnonzero(self.B[:, j])
+            adj[np.ix_(members, members)] = degrees[j]
+        np.fill_diagonal(adj, np.inf)
+        return adj
+
+    def frozen_dist(self) -> np.ndarray:
+        """Матрица кратчайших расстояний текущего состояния (для mil01)"""
+        if self.dist is None:
+            from scipy.sparse.csgraph import shortest_path
+            self.dist = shortest_path(self.adjacency(), method='auto', directed=False)
+        return self.dist
+
+    def utilities(self) -> np.ndarray:
+        """Полезности агентов в текущем состоянии"""
+        dist = self.frozen_dist() if self.model == 'mil01' else None
+        return population_utilities(self.B, self.model, self.c, self.alpha, dist=dist)
+
+    def step(self):
+        """
+        Один синхронный раунд
+
+        Returns:
+            (агенты, drop, add) применённых ходов
+        """
+        drop, add, improvement = self.best_responses()
+        movers = np.flatnonzero(improvement > self.tol)
+        drop, add = drop[movers], add[movers]
+        has_drop = drop != NO_IDEA
+        has_add = add != NO_IDEA
+        self.B[movers[has_drop], drop[has_drop]] = 0
+        self.B[movers[has_add], add[has_add]] = 1
+        self.dist = None
+        return movers, drop, add
+
+    def run(self, max_rounds=None, order=None, callback=None):
+        """
+        Синхронная динамика до равновесия, цикла или предела раундов
+
+        Args:
+            max_rounds: предел числа раундов (по умолчанию 500 * N, как в evolve_sim)
+            order: порядок строк в снимках (например, порядок обхода Game.agents)
+            callback: функция (раунд, равновесие), вызываемая после каждого раунда
+        Returns:
+            snapshots, edge_changes, utilities, flagss в формате Game.evolve_sim
+        """
+        if max_rounds is None:
+            max_rounds = 500 * self.N
+        order = np.arange(self.N) if order is None else np.asarray(order)
+        snapshots, edge_changes, utilities, flagss = [], [], [], []
+        seen = set()
+        flag = False
+        cycle_flag = False
+        raund = 1
+        while not flag and raund < max_rounds and not cycle_flag:
+            key = self.B.tobytes()
+            cycle_flag = key in seen
+            seen.add(key)
+            snapshots.append(self.B[order].copy())
+            utilities.append(self.utilities()[order].tolist())
+            flagss.append(flag)
+            movers, drop, add = self.step()
+            changed_edges = set()
+            for agent, i, j in zip(movers, drop, add):
+                if i != NO_IDEA:
+                    changed_edges.add((f"A{agent}", f"I{i}", -0.5))
+                if j != NO_IDEA:
+                    changed_edges.add((f"A{agent}", f"I{j}", 0.5))
+            edge_changes.append(changed_edges)
+            flag = len(movers) == 0
+            if callback is not None:
+                callback(raund, flag)
+            raund += 1
+
+        self.rounds = raund - 1
+        self.outcome = 'equilibrium' if flag else 'cycle' if cycle_flag else 'limit'
+        snapshots.append(self.B[order].copy())
+        utilities.append(self.utilities()[order].tolist())
+        edge_changes.append(set())
+        flagss.append(flag)
+        return snapshots, edge_changes, utilities, flagss
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use("Agg")
+pytest.importorskip("PIL")
+
+import matplotlib.animation as animation
+import matplotlib.pyplot as plt
+
+from visual import animate_raster, block_order, draw_raster, rasterize_edges
+
+
+def _trajectory():
+    """Траектория, у которой рёбер больше всего в среднем кадре"""
+    sparse = np.zeros((6, 4), dtype=np.uint8)
+    sparse[0, 0] = sparse[1, 0] = 1
+    dense = np.ones((6, 4), dtype=np.uint8)
+    snapshots = [sparse, dense, sparse.copy()]
+    utilities = [np.zeros(6) for _ in snapshots]
+    return snapshots, [set() for _ in snapshots], utilities, [False, False, True]
+
+
+def test_draw_raster_edges():
+    fig, ax = plt.subplots()
+    draw_raster(_trajectory()[0][1], view="edges", ax=ax, width=20, height=40)
+    assert ax.images
+    plt.close(fig)
+
+
+def test_animate_raster_edges_scale_covers_all_frames(tmp_path, monkeypatch):
+    snapshots, edge_changes, utilities, eq = _trajectory()
+    save = animation.FuncAnimation.save
+    # ffmpeg может отсутствовать: кадры рендерятся тем же путём через pillow
+    monkeypatch.setattr(animation.FuncAnimation, "save",
+                        lambda self, filename, writer=None, **kwargs: save(self, filename, writer="pillow", **kwargs))
+    figures = []
+    close = plt.close
+    monkeypatch.setattr(plt, "close", lambda fig=None: (figures.append(fig), close(fig)))
+
+    filename = tmp_path / "edges.gif"
+    animate_raster(snapshots, edge_changes, utilities, eq, filename=str(filename), view="edges", width=20, height=40)
+
+    assert filename.stat().st_size > 0
+    vmax = figures[-1].axes[0].images[0].get_clim()[1]
+    agent_order, idea_order = block_order(snapshots[-1])
+    expected = max(np.log1p(rasterize_edges(snapshot, 20, 40, agent_order, idea_order).max()) for snapshot in snapshots)
+    assert expected > np.log1p(rasterize_edges(snapshots[0], 20, 40, agent_order, idea_order).max())
+    assert vmax == pytest.approx(expected)
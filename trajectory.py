@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def changes_table(edge_changes) -> np.ndarray:
+    """
+    Изменённые рёбра траектории одной таблицей
+
+    Returns:
+        Матрица (K, 4): кадр, агент, идея, знак изменения
+    """
+    changes = [(frame, int(agent[1:]), int(idea[1:]), float(sign))
+               for frame, edges in enumerate(edge_changes)
+               for agent, idea, sign in edges]
+    return np.array(changes, dtype=float).reshape(-1, 4)
+
+
+def save_trajectory(path, snapshots, edge_changes, utilities, flagss):
+    """
+    Сохраняет траекторию (вывод Game.run) в один .npz
+
+    Изменённые рёбра хранятся таблицей (кадр, агент, идея, знак изменения).
+
+    Args:
+        path: путь к файлу
+        snapshots, edge_changes, utilities, flagss: списки одинаковой длины
+    """
+    np.savez_compressed(
+        path,
+        snapshots=np.array(snapshots, dtype=np.uint8),
+        utilities=np.array(utilities, dtype=float),
+        flags=np.array(flagss, dtype=bool),
+        changes=changes_table(edge_changes),
+    )
+
+
+def load_trajectory(path):
+    """
+    Читает траекторию, записанную save_trajectory
+
+    Returns:
+        snapshots, edge_changes, utilities, flagss в формате Game.run
+    """
+    with np.load(path) as data:
+        snapshots = list(data['snapshots'])
+        utilities = data['utilities'].tolist()
+        flagss = data['flags'].tolist()
+        edge_changes = [set() for _ in snapshots]
+        for frame, agent, idea, sign in data['changes']:
+            edge_changes[int(frame)].add((f"A{int(agent)}", f"I{int(idea)}", float(sign)))
+    return snapshots, edge_changes, utilities, flagss
@@ -1,12 +1,16 @@
-import networkx as nx
-import matplotlib.pyplot as plt
-from networkx.algorithms import bipartite
-from matplotlib.animation import FuncAnimation, FFMpegWriter
-import matplotlib.animation as animation
+from functools import lru_cache
+
+import numpy as np
 
 from agents_and_ideas import Agent, Idea
+from trajectory import changes_table
+
+# networkx нужен только рисованию графов (bip, draw_bip, get_bipartite_pos, animate), а
+# matplotlib - функциям рисования; оба импортируются в функциях, которым они нужны:
+# растровый вид и сводка траектории работают без networkx, а порядок и растеризация
+# (block_order, rasterize_edges) - без matplotlib
 
-def bip(agents: set[Agent]) -> nx.Graph:
+def bip(agents: set[Agent]) -> 'nx.Graph':
     """
     Преобразует множество агентов в двудольный граф.
     Агенты и идеи — разные доли. Рёбра соединяют агента и идею, если вектор hedges содержит 1.
@@ -14,6 +18,7 @@ def bip(agents: set[Agent]) -> nx.Graph:
     Returns:
         G: двудольный граф NetworkX
     """
+    import networkx as nx
     G = nx.Graph()
 
     for agent in agents:
@@ -29,6 +34,8 @@ def bip(agents: set[Agent]) -> nx.Graph:
     return G
 
 def draw_bip(agents: set[Agent]):
+    import matplotlib.pyplot as plt
+    import networkx as nx
     G = bip(agents)
 
     # Получим наборы узлов каждой доли
@@ -46,6 +53,7 @@ def draw_bip(agents: set[Agent]):
     plt.show()
 
 def get_bipartite_pos(num_agents, num_ideas):
+    import networkx as nx
     # Создаём двудольный граф с числовыми узлами
     B = nx.complete_bipartite_graph(num_agents, num_ideas)
 
@@ -62,6 +70,9 @@ def get_bipartite_pos(num_agents, num_ideas):
     return pos
 
 def animate(snapshots, edge_changes, utilities, eq, filename="animation.mp4", interval=1000):
+    import matplotlib.animation as animation
+    import matplotlib.pyplot as plt
+    import networkx as nx
 
     num_agents, num_ideas = snapshots[0].shape
     agent_nodes = [f"A{i}" for i in range(num_agents)]
@@ -133,4 +144,244 @@ def animate(snapshots, edge_changes, utilities, eq, filename="animation.mp4", in
 
     ani = animation.FuncAnimation(fig, update, frames=len(snapshots), interval=interval)
     ani.save(filename, writer="ffmpeg")
-    plt.close()
\ No newline at end of file
+    plt.close()
+
+
+@lru_cache(maxsize=32)
+def bipartite_layout(num_agents, num_ideas):
+    """
+    Детерминированная двудольная раскладка для больших популяций (вместо spring_layout):
+    агенты на x = 0, идеи на x = 1, равномерно по y в [0, 1]
+
+    Returns:
+        agent_y, idea_y - координаты y (только для чтения, результат кэшируется)
+    """
+    agent_y = (np.arange(num_agents) + 0.5) / num_agents
+    idea_y = (np.arange(num_ideas) + 0.5) / num_ideas
+    agent_y.flags.writeable = False
+    idea_y.flags.writeable = False
+    return agent_y, idea_y
+
+
+def block_order(matrix):
+    """
+    Порядок, выделяющий блоки в матрице hedges: идеи по убыванию степени,
+    агенты лексикографически по строкам в этом порядке идей
+
+    Returns:
+        agent_order, idea_order - перестановки индексов
+    """
+    matrix = np.asarray(matrix)
+    idea_order = np.argsort(-matrix.sum(axis=0), kind='stable')
+    ordered = matrix[:, idea_order]
+    agent_order = np.lexsort(-ordered.T[::-1].astype(np.int8)) if ordered.shape[1] else np.arange(len(matrix))
+    return agent_order, idea_order
+
+
+def rasterize_edges(matrix, width=400, height=800, agent_order=None, idea_order=None, block_pixels=1 << 22):
+    """
+    Растр рёбер двудольного графа: сколько рёбер агент-идея проходит через каждый пиксель
+
+    Ребро - отрезок от агента (x = 0) к идее (x = 1) в раскладке bipartite_layout;
+    в каждом столбце пикселей считается его строка, так что стоимость O(рёбра * width)
+    без построения графа.
+
+    Args:
+        matrix: матрица hedges (N, M)
+        width, height: размер растра
+        agent_order, idea_order: порядок агентов и идей сверху вниз (по умолчанию по индексу)
+        block_pixels: сколько пикселей обрабатывать за один блок рёбер
+    Returns:
+        Матрица (height, width) числа рёбер
+    """
+    matrix = np.asarray(matrix)
+    num_agents, num_ideas = matrix.shape
+    agent_y, idea_y = bipartite_layout(num_agents, num_ideas)
+    if agent_order is not None:
+        agent_y = agent_y[np.argsort(agent_order)]
+    if idea_order is not None:
+        idea_y = idea_y[np.argsort(idea_order)]
+    rows, cols = np.nonzero(matrix)
+    t = np.linspace(0, 1, width)
+    columns = np.arange(width)
+    image = np.zeros(height * width, dtype=np.int64)
+    step = max(1, block_pixels // width)
+    for start in range(0, len(rows), step):
+        ya = agent_y[rows[start:start + step]]
+        yi = idea_y[cols[start:start + step]]
+        y = ya[:, None] + (yi - ya)[:, None] * t[None, :]
+        pixels = np.minimum((y * height).astype(np.int64), height - 1)
+        image += np.bincount((pixels * width + columns).ravel(), minlength=height * width)
+    return image.reshape(height, width)
+
+
+def _change_matrix(changes, num_agents, num_ideas):
+    """Матрица изменений кадра: +1 добавленное ребро, -1 удалённое"""
+    result = np.zeros((num_agents, num_ideas), dtype=np.int8)
+    for agent, idea, sign in changes:
+        result[int(agent[1:]), int(idea[1:])] = 1 if sign > 0 else -1
+    return result
+
+
+# Цвета растра инцидентности: пусто, ребро, добавленное ребро, удалённое ребро
+INCIDENCE_COLORS = ["white", "dimgray", "green", "red"]
+
+
+def _incidence_frame(matrix, changes, agent_order, idea_order):
+    frame = np.asarray(matrix, dtype=np.int8).copy()
+    frame[changes > 0] = 2
+    frame[changes < 0] = 3
+    return frame[agent_order][:, idea_order]
+
+
+def draw_raster(matrix, view="incidence", ax=None, order="block", width=400, height=800):
+    """
+    Растровое изображение состояния для больших популяций (без networkx)
+
+    Args:
+        matrix: матрица hedges (N, M)
+        view: 'incidence' - изображение агенты x идеи, 'edges' - плотность рёбер (log)
+        ax: оси matplotlib (по умолчанию новая фигура)
+        order: 'block' (block_order) или None - порядок по индексам
+    Returns:
+        ax
+    """
+    import matplotlib.pyplot as plt
+    matrix = np.asarray(matrix)
+    num_agents, num_ideas = matrix.shape
+    if order == "block":
+        agent_order, idea_order = block_order(matrix)
+    else:
+        agent_order, idea_order = np.arange(num_agents), np.arange(num_ideas)
+    if ax is None:
+        _, ax = plt.subplots(figsize=(10, 10))
+    if view == "incidence":
+        ax.imshow(matrix[agent_order][:, idea_order], aspect="auto", interpolation="nearest", cmap="Greys")
+        ax.set_xlabel("идеи")
+        ax.set_ylabel("агенты")
+    elif view == "edges":
+        image = rasterize_edges(matrix, width, height, agent_order, idea_order)
+        ax.imshow(np.log1p(image), aspect="auto", origin="lower", extent=(0, 1, 0, 1), cmap="magma")
+        ax.set_xticks([0, 1], ["агенты", "идеи"])
+        ax.set_yticks([])
+    else:
+        raise ValueError(f"Неизвестный вид: {view}")
+    return ax
+
+
+def animate_raster(snapshots, edge_changes, utilities, eq, filename="animation.mp4", interval=1000,
+                   view="incidence", width=400, height=800):
+    """
+    Видео траектории для тысяч агентов: кадр - растр (draw_raster), обновляемый через set_data
+
+    Порядок агентов и идей один на всё видео (block_order по последнему снимку).
+    В виде 'incidence' рёбра кадра подсвечены: добавленные зелёным, удалённые красным.
+    Аргументы те же, что у animate.
+    """
+    import matplotlib.animation as animation
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import ListedColormap
+    num_agents, num_ideas = snapshots[0].shape
+    agent_order, idea_order = block_order(snapshots[-1])
+    fig, ax = plt.subplots(figsize=(12, 12))
+
+    def frame_image(frame):
+        if view == "incidence":
+            changes = _change_matrix(edge_changes[frame], num_agents, num_ideas)
+            return _incidence_frame(snapshots[frame], changes, agent_order, idea_order)
+        return np.log1p(rasterize_edges(snapshots[frame], width, height, agent_order, idea_order))
+
+    if view == "incidence":
+        image = ax.imshow(frame_image(0), aspect="auto", interpolation="nearest", cmap=ListedColormap(INCIDENCE_COLORS),
+                          vmin=0, vmax=3)
+        ax.set_xlabel("идеи")
+        ax.set_ylabel("агенты")
+    elif view == "edges":
+        # Рёбер может быть больше всего в середине траектории, поэтому шкала - по всем кадрам
+        vmax = max(np.log1p(rasterize_edges(snapshot, width, height, agent_order, idea_order).max())
+                   for snapshot in snapshots)
+        image = ax.imshow(frame_image(0), aspect="auto", origin="lower", extent=(0, 1, 0, 1), cmap="magma",
+                          vmin=0, vmax=vmax)
+        ax.set_xticks([0, 1], ["агенты", "идеи"])
+        ax.set_yticks([])
+    else:
+        raise ValueError(f"Неизвестный вид: {view}")
+
+    def update(frame):
+        image.set_data(frame_image(frame))
+        welfare = float(np.sum(utilities[frame]))
+        ax.set_title(f"Step {frame}, welfare {welfare:.2f} " + ("Равновесие!" if eq[frame] else "не равновесие..."),
+                     fontsize=14)
+        return (image,)
+
+    ani = animation.FuncAnimation(fig, update, frames=len(snapshots), interval=interval, blit=False)
+    ani.save(filename, writer="ffmpeg")
+    plt.close(fig)
+
+
+def trajectory_report(snapshots, edge_changes, utilities, eq, filename=None, max_agent_lines=2000):
+    """
+    Сводка траектории одним рисунком вместо видео: все панели строятся из массивов
+    за один проход, без графа networkx
+
+    Панели: полезности агентов по кадрам (одна LineCollection) и средняя полезность;
+    степени идей по кадрам (тепловая карта); растр изменённых рёбер (агент по кадрам,
+    добавления зелёным, удаления красным); число изменений в кадре. Вертикальная
+    линия отмечает первый кадр равновесия.
+
+    Args:
+        snapshots, edge_changes, utilities, eq: траектория в формате Game.run
+        filename: куда сохранить рисунок (None - только вернуть)
+        max_agent_lines: наибольшее число линий полезности (агенты берутся равномерно)
+    Returns:
+        Рисунок matplotlib
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    U = np.asarray(utilities, dtype=float)
+    frames_count, num_agents = U.shape
+    frames = np.arange(frames_count)
+    degrees = np.array([np.asarray(snapshot).sum(axis=0) for snapshot in snapshots])
+    table = changes_table(edge_changes)
+    eq = np.asarray(eq, dtype=bool)
+
+    fig, axes = plt.subplots(4, 1, figsize=(14, 16), sharex=True, gridspec_kw={"height_ratios": [3, 3, 3, 1]})
+    ax_utility, ax_degrees, ax_changes, ax_counts = axes
+
+    shown = np.unique(np.linspace(0, num_agents - 1, min(num_agents, max_agent_lines)).astype(int))
+    segments = np.stack([np.broadcast_to(frames, (len(shown), frames_count)), U[:, shown].T], axis=2)
+    ax_utility.add_collection(LineCollection(segments, colors="steelblue", linewidths=0.5, alpha=0.3))
+    ax_utility.plot(frames, U.mean(axis=1), color="black", linewidth=2, label="средняя полезность")
+    ax_utility.autoscale_view()
+    ax_utility.set_ylabel("полезность")
+    ax_utility.legend(loc="upper left")
+
+    image = ax_degrees.imshow(degrees.T, aspect="auto", origin="lower", interpolation="nearest", cmap="viridis",
+                              extent=(-0.5, frames_count - 0.5, -0.5, degrees.shape[1] - 0.5))
+    fig.colorbar(image, ax=ax_degrees, label="степень", pad=0.01)
+    ax_degrees.set_ylabel("идеи")
+
+    added = table[:, 3] > 0
+    ax_changes.scatter(table[added, 0], table[added, 1], s=4, marker="|", color="green", label="добавлено")
+    ax_changes.scatter(table[~added, 0], table[~added, 1], s=4, marker="|", color="red", label="удалено")
+    ax_changes.set_ylabel("агенты")
+    ax_changes.legend(loc="upper right")
+
+    counts = np.bincount(table[:, 0].astype(int), minlength=frames_count)
+    ax_counts.bar(frames, counts, width=1.0, color="gray")
+    ax_counts.set_ylabel("изменений")
+    ax_counts.set_xlabel("кадр")
+
+    if eq.any():
+        first = int(np.argmax(eq))
+        for ax in axes:
+            ax.axvline(first, color="black", linestyle="--", linewidth=1)
+        title = f"Равновесие с кадра {first}"
+    else:
+        title = "Равновесие не достигнуто"
+    fig.suptitle(f"{title}; кадров {frames_count}, агентов {num_agents}, идей {degrees.shape[1]}", fontsize=14)
+    fig.tight_layout()
+    if filename is not None:
+        fig.savefig(filename, dpi=120)
+        plt.close(fig)
+    return fig
@@ -0,0 +1,292 @@
+"""
+Очередь запусков в общем каталоге для сборки плана на нескольких машинах
+
+    root/tasks/<key>.json   - описание запуска (ensemble.make_spec), ждёт исполнителя
+    root/leases/<key>.json  - аренда: кто выполняет и когда последний раз подтверждал
+    root/done/<key>         - запуск выполнен, сводка в хранилище результатов
+    root/failed/<key>.json  - запуск упал, текст ошибки
+
+Аренда создаётся с O_CREAT | O_EXCL, поэтому запуск получает ровно один
+исполнитель. Исполнитель продлевает свои аренды (время изменения файла);
+просроченная аренда переименовывается тем, кто её заметил, и запуск снова
+доступен. Нужна файловая система с атомарными rename и O_EXCL (локальный
+диск, NFSv3+); lease_seconds должно заметно превышать расхождение часов узлов.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from ensemble import run_spec
+from sweep import ResultStore, spec_key
+
+
+class WorkQueue:
+    """Очередь запусков на файлах с арендами, продлением и возвратом брошенных запусков"""
+
+    def __init__(self, root, lease_seconds=300.0):
+        """
+        Args:
+            root: общий каталог очереди (создаётся при необходимости)
+            lease_seconds: через сколько секунд без продления аренда считается брошенной
+        """
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.dirs = {name: os.path.join(root, name) for name in ('tasks', 'leases', 'done', 'failed')}
+        for path in self.dirs.values():
+            os.makedirs(path, exist_ok=True)
+
+    def _path(self, kind: str, key: str) -> str:
+        suffix = '' if kind == 'done' else '.json'
+        return os.path.join(self.dirs[kind], key + suffix)
+
+    def _keys(self, kind: str) -> list[str]:
+        return sorted(name[:-len('.json')] for name in os.listdir(self.dirs[kind]) if name.endswith('.json'))
+
+    @staticmethod
+    def _write_atomic(path: str, payload: dict):
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    # --- постановка ----------------------------------------------------------
+
+    def submit(self, specs: list[dict]) -> int:
+        """
+        Ставит запуски в очередь, пропуская уже стоящие, выполненные и упавшие
+
+        Returns:
+            Количество добавленных запусков
+        """
+        added = 0
+        for spec in specs:
+            key = spec_key(spec)
+            if any(os.path.exists(self._path(kind, key)) for kind in ('tasks', 'done', 'failed')):
+                continue
+            self._write_atomic(self._path('tasks', key), spec)
+            added += 1
+        return added
+
+    def status(self) -> dict:
+        """Число ожидающих, арендованных (из них просроченных), выполненных и упавших запусков"""
+        leased = self._keys('leases')
+        return {
+            'pending': len(set(self._keys('tasks')) - set(leased)),
+            'leased': len(leased),
+            'expired': sum(self._expired(key) for key in leased),
+            'done': len(os.listdir(self.dirs['done'])),
+            'failed': len(self._keys('failed')),
+        }
+
+    # --- аренды --------------------------------------------------------------
+
+    def _expired(self, key: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self._path('leases', key)) > self.lease_seconds
+        except FileNotFoundError:
+            return False
+
+    def _owner(self, key: str):
+        try:
+            with open(self._path('leases', key)) as f:
+                return json.load(f).get('worker')
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _break_lease(self, key: str) -> bool:
+        """Снимает просроченную аренду; True, если аренды больше нет"""
+        path = self._path('leases', key)
+        stale = f"{path}.expired-{uuid.uuid4().hex[:8]}"
+        try:
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return True
+        if time.time() - os.path.getmtime(stale) <= self.lease_seconds:
+            # Владелец успел продлить аренду между проверкой и переименованием - возвращаем её
+            try:
+                os.link(stale, path)
+            except FileExistsError:
+                pass
+            os.remove(stale)
+            return False
+        os.remove(stale)
+        return True
+
+    def requeue_expired(self) -> int:
+        """Возвращает в очередь запуски с просроченными арендами"""
+        return sum(self._break_lease(key) for key in self._keys('leases') if self._expired(key))
+
+    def claim(self, worker: str, rng=None):
+        """
+        Арендует первый свободный запуск
+
+        Args:
+            worker: идентификатор исполнителя
+            rng: генератор для случайного порядка просмотра (меньше столкновений между узлами)
+        Returns:
+            (key, spec) или None, если свободных запусков нет
+        """
+        keys = self._keys('tasks')
+        if rng is not None:
+            rng.shuffle(keys)
+        for key in keys:
+            if os.path.exists(self._path('done', key)):
+                continue
+            if self._expired(key) and not self._break_lease(key):
+                continue
+            try:
+                fd = os.open(self._path('leases', key), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'worker': worker, 'host': socket.gethostname(), 'pid': os.getpid(),
+                           'claimed': time.time()}, f)
+            try:
+                with open(self._path('tasks', key)) as f:
+                    return key, json.load(f)
+            except FileNotFoundError:
+                # Запуск завершён другим исполнителем, пока мы брали аренду
+                self.release(key, worker)
+        return None
+
+    def heartbeat(self, key: str, worker: str) -> bool:
+        """Продлевает аренду; False, если она уже принадлежит другому исполнителю"""
+        if self._owner(key) != worker:
+            return False
+        try:
+            os.utime(self._path('leases', key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, key: str, worker: str):
+        """Отдаёт аренду, не выполнив запуск (он снова доступен)"""
+        if self._owner(key) == worker:
+            try:
+                os.remove(self._path('leases', key))
+            except FileNotFoundError:
+                pass
+
+    def complete(self, key: str, worker: str):
+        """Отмечает запуск выполненным (после того как сводка записана в хранилище)"""
+        open(self._path('done', key), 'w').close()
+        try:
+            os.remove(self._path('tasks', key))
+        except FileNotFoundError:
+            pass
+        self.release(key, worker)
+
+    def fail(self, key: str, worker: str, error: str):
+        """Отмечает запуск упавшим, чтобы он не повторялся бесконечно"""
+        self._write_atomic(self._path('failed', key), {'worker': worker, 'error': error})
+        try:
+            os.remove(self._path('tasks', key))
+        except FileNotFoundError:
+            pass
+        self.release(key, worker)
+
+
+class _Heartbeat:
+    """Поток, продлевающий аренды исполнителя, пока запуски считаются и ждут записи"""
+
+    def __init__(self, queue: WorkQueue, worker: str):
+        self.queue = queue
+        self.worker = worker
+        self.keys: set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            with self._lock:
+                keys = list(self.keys)
+            for key in keys:
+                self.queue.heartbeat(key, self.worker)
+
+    def add(self, key: str):
+        with self._lock:
+            self.keys.add(key)
+
+    def discard(self, key: str):
+        with self._lock:
+            self.keys.discard(key)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue_root, store_root, worker=None, lease_seconds=300.0, flush_every=1, cache=None,
+               wait=False, poll_seconds=5.0, max_tasks=None) -> int:
+    """
+    Исполнитель: берёт запуски из очереди, пока они есть, и пишет сводки в общее хранилище
+
+    Запуск отмечается выполненным только после записи части с его сводкой;
+    если исполнитель падает раньше, аренда истекает и запуск берёт другой.
+
+    Args:
+        queue_root: каталог WorkQueue
+        store_root: каталог ResultStore (общий для всех исполнителей)
+        worker: идентификатор исполнителя (по умолчанию host-pid-случайный суффикс)
+        lease_seconds: срок аренды без продления
+        flush_every: сколько сводок накапливать перед записью части
+        cache: каталог ResultCache (None - без кэша)
+        wait: ждать новых запусков, пока есть чужие аренды, вместо выхода при пустой очереди
+        poll_seconds: пауза между проверками очереди при wait
+        max_tasks: предел числа запусков этого исполнителя
+    Returns:
+        Количество выполненных запусков
+    """
+    queue = WorkQueue(queue_root, lease_seconds=lease_seconds)
+    store = ResultStore(store_root)
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    rng = np.random.default_rng(abs(hash(worker)) % (2 ** 32))
+    finished = 0
+    unflushed = []
+
+    def flush():
+        store.flush()
+        for key in unflushed:
+            queue.complete(key, worker)
+            heartbeat.discard(key)
+        unflushed.clear()
+
+    with _Heartbeat(queue, worker) as heartbeat:
+        try:
+            while max_tasks is None or finished < max_tasks:
+                queue.requeue_expired()
+                claimed = queue.claim(worker, rng)
+                if claimed is None:
+                    # Свободных запусков нет: сначала записываем свои, затем ждём чужие аренды
+                    flush()
+                    if wait and queue.status()['leased']:
+                        time.sleep(poll_seconds)
+                        continue
+                    break
+                key, spec = claimed
+                heartbeat.add(key)
+                try:
+                    summary = run_spec(spec, cache=cache)
+                except Exception as error:
+                    queue.fail(key, worker, repr(error))
+                    heartbeat.discard(key)
+                    continue
+                summary['key'] = key
+                store.append(summary)
+                unflushed.append(key)
+                finished += 1
+                if len(unflushed) >= flush_every:
+                    flush()
+        finally:
+            flush()
+    return finished